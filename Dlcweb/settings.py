@@ -167,6 +167,33 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Custom User Model
 AUTH_USER_MODEL = 'main.User'
 
+# Print header detection and column mapping details when importing Dean's Lists
+DEAN_LIST_DEBUG = os.environ.get('DEAN_LIST_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+# Resolve the portal counters (main.context_processors.user_stats) only when a template uses them
+USER_STATS_LAZY = os.environ.get('USER_STATS_LAZY', 'true').lower() in ('1', 'true', 'yes')
+
+# Scheduled backups (manage.py scheduled_backup): where snapshots go and how many of each tier to keep
+BACKUP_DIR = os.environ.get('BACKUP_DIR', os.path.join(BASE_DIR, 'database_backups', 'scheduled'))
+BACKUP_RETENTION = {
+    'hourly': int(os.environ.get('BACKUP_KEEP_HOURLY', 24)),
+    'daily': int(os.environ.get('BACKUP_KEEP_DAILY', 7)),
+    'weekly': int(os.environ.get('BACKUP_KEEP_WEEKLY', 4)),
+}
+
+# fetch_courses: parallel info page downloads and the request rate limit towards the CMU site
+COURSE_FETCH_CONCURRENCY = int(os.environ.get('COURSE_FETCH_CONCURRENCY', 4))
+COURSE_FETCH_RATE = float(os.environ.get('COURSE_FETCH_RATE', 4))  # requests per second, 0 = unlimited
+COURSE_PAGE_CACHE_DIR = os.environ.get('COURSE_PAGE_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'course_pages'))
+
+# image_proxy: on-disk LRU cache of upstream images, revalidated after IMAGE_PROXY_FRESH_SECONDS
+IMAGE_PROXY_CACHE_DIR = os.environ.get('IMAGE_PROXY_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'images'))
+IMAGE_PROXY_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_PROXY_CACHE_MAX_MB', 200)) * 1024 * 1024
+IMAGE_PROXY_FRESH_SECONDS = int(os.environ.get('IMAGE_PROXY_FRESH_SECONDS', 3600))
+IMAGE_PROXY_MAX_IMAGE_BYTES = 20 * 1024 * 1024
+# Upstream errors are remembered this long, so broken links fail fast instead of timing out on every view
+IMAGE_PROXY_NEGATIVE_SECONDS = int(os.environ.get('IMAGE_PROXY_NEGATIVE_SECONDS', 300))
+
 # Cloudinary Configuration for File Storage (Production)
 if not DEBUG:
     # Use Cloudinary for media files in production
@@ -1,23 +1,65 @@
+from django.conf import settings
+from django.core.cache import cache
+
 from .models import User, DeanList, DeanListStudent, Application
 
-def user_stats(request):
+USER_STATS_CACHE_KEY = 'user_stats'
+USER_STATS_CACHE_TIMEOUT = 60  # seconds, signals invalidate earlier on changes
+USER_STATS_KEYS = ['pending_applications', 'member_count', 'dean_list_count', 'total_dean_list_students']
+
+
+def get_user_stats():
     """
-    Context processor to add user statistics to all templates.
+    Return the portal counters, computing and caching them on a cache miss.
     """
+    stats = cache.get(USER_STATS_CACHE_KEY)
+    if stats is not None:
+        return stats
+
     # Get the most recent dean's list
     latest_dean_list = DeanList.objects.order_by('-created_at').first()
-    
+
     # Count students in the latest dean's list only
     latest_dean_list_students = 0
     if latest_dean_list:
         latest_dean_list_students = DeanListStudent.objects.filter(dean_list=latest_dean_list).count()
-    
+
     # Count pending applications
     pending_applications = Application.objects.count()
-    
-    return {
+
+    stats = {
         'pending_applications': pending_applications,
         'member_count': User.objects.filter(is_member=True).count(),
         'dean_list_count': DeanList.objects.count(),
         'total_dean_list_students': latest_dean_list_students,
     }
+    cache.set(USER_STATS_CACHE_KEY, stats, USER_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_user_stats():
+    """Drop the cached portal counters so the next request recomputes them"""
+    cache.delete(USER_STATS_CACHE_KEY)
+
+
+def user_stats(request):
+    """
+    Context processor to add user statistics to all templates.
+
+    With USER_STATS_LAZY (the default) each variable is a callable, which the
+    template engine calls on first use, so pages that never show the counters
+    (home, events, ...) don't touch the cache or the database at all.
+    """
+    if not getattr(settings, 'USER_STATS_LAZY', True):
+        return get_user_stats()
+
+    stats = {}
+
+    def lazy_stat(key):
+        def resolve():
+            if not stats:
+                stats.update(get_user_stats())
+            return stats[key]
+        return resolve
+
+    return {key: lazy_stat(key) for key in USER_STATS_KEYS}
@@ -0,0 +1,152 @@
+"""
+In-process search index for the course catalog.
+
+The active courses are loaded once into a CourseIndex holding an n-gram
+index over course id and name, the department facet and a small cache of
+result lists. course_descriptions and the autocomplete endpoint search it
+instead of running icontains queries on every request. The index is dropped
+when courses change (signals, fetch_courses --sync) and the catalog
+signature is rechecked every INDEX_RECHECK_SECONDS to pick up changes made
+by other processes.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.db.models import Count, Max
+
+from .models import Course
+
+NGRAM_SIZE = 3
+INDEX_RECHECK_SECONDS = 60
+RESULT_CACHE_SIZE = 256
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _ngrams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class CourseIndex:
+    """Immutable snapshot of the active catalog, searchable by substring"""
+
+    def __init__(self, courses, signature=None):
+        self.courses = courses
+        self.signature = signature
+        self.checked_at = time.monotonic()
+        self.departments = sorted({course.department for course in courses if course.department})
+        self.keys = [(course.course_id.lower(), course.course_name.lower()) for course in courses]
+
+        # gram -> positions in self.courses, for every gram length up to NGRAM_SIZE
+        # so one and two character queries are index lookups too
+        self.postings = {}
+        for position, (course_id, course_name) in enumerate(self.keys):
+            grams = set()
+            for size in range(1, NGRAM_SIZE + 1):
+                grams |= _ngrams(course_id, size) | _ngrams(course_name, size)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(position)
+
+        self.results = OrderedDict()
+        self.results_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, signature=None):
+        courses = list(Course.objects.filter(is_active=True).order_by('course_id'))
+        return cls(courses, signature)
+
+    def matching_positions(self, query):
+        """Positions of the courses whose id or name contains query (case-insensitive)"""
+        if not query:
+            return list(range(len(self.courses)))
+
+        size = min(len(query), NGRAM_SIZE)
+        candidates = None
+        for gram in _ngrams(query, size):
+            positions = self.postings.get(gram)
+            if not positions:
+                return []
+            candidates = set(positions) if candidates is None else candidates & set(positions)
+            if not candidates:
+                return []
+
+        # The grams only narrow the candidates down, confirm the full substring
+        return sorted(
+            position for position in candidates
+            if query in self.keys[position][0] or query in self.keys[position][1]
+        )
+
+    def search(self, query='', department=None):
+        """Active courses matching query and department, in course_id order"""
+        query = (query or '').strip().lower()
+        cache_key = (query, department or '')
+        with self.results_lock:
+            if cache_key in self.results:
+                self.results.move_to_end(cache_key)
+                return self.results[cache_key]
+
+        results = [self.courses[position] for position in self.matching_positions(query)]
+        if department:
+            results = [course for course in results if course.department == department]
+
+        with self.results_lock:
+            self.results[cache_key] = results
+            if len(self.results) > RESULT_CACHE_SIZE:
+                self.results.popitem(last=False)
+        return results
+
+    def autocomplete(self, query, limit=10):
+        """
+        Suggestions for query: course ids starting with it first, then names
+        with a word starting with it, then any other substring match.
+        """
+        query = (query or '').strip().lower()
+        if not query:
+            return []
+
+        def rank(position):
+            course_id, course_name = self.keys[position]
+            if course_id.startswith(query):
+                return 0
+            if course_name.startswith(query) or f' {query}' in course_name:
+                return 1
+            return 2
+
+        positions = sorted(self.matching_positions(query), key=lambda position: (rank(position), position))
+        return [self.courses[position] for position in positions[:limit]]
+
+
+def catalog_signature():
+    """Cheap fingerprint of the active catalog, changes whenever a course is added, changed or removed"""
+    stats = Course.objects.filter(is_active=True).aggregate(count=Count('id'), updated=Max('last_updated'))
+    return stats['count'], stats['updated']
+
+
+def get_course_index():
+    """The current CourseIndex, rebuilt when the catalog changed"""
+    global _index
+
+    index = _index
+    if index is not None and time.monotonic() - index.checked_at < INDEX_RECHECK_SECONDS:
+        return index
+
+    with _index_lock:
+        index = _index
+        if index is not None and time.monotonic() - index.checked_at < INDEX_RECHECK_SECONDS:
+            return index
+
+        signature = catalog_signature()
+        if index is None or index.signature != signature:
+            index = CourseIndex.build(signature)
+            _index = index
+        else:
+            index.checked_at = time.monotonic()
+        return index
+
+
+def invalidate_course_index():
+    """Drop the index so the next search rebuilds it from the database"""
+    global _index
+    _index = None
@@ -0,0 +1,603 @@
+"""
+Merge engine behind restore_database: copies the rows of an uploaded SQLite
+database that the current database does not have yet.
+
+Rows are matched on natural keys (username, event title + start date, ...)
+because primary keys differ between databases. The natural keys already in
+the target are loaded once per table into sets, source ids are translated
+to target ids through maps built in one pass per parent table, and new rows
+are written with chunked bulk_create(ignore_conflicts=True), one
+transaction per chunk.
+
+Restores run as background jobs (run_restore_job). A job's upload and its
+state - status, stats and a checkpoint of the last committed chunk (table
+and source rowid) - live on disk in RESTORE_JOBS_DIR, so a job interrupted
+by a worker restart can be resumed where it stopped. Re-merging a chunk is
+harmless because rows are matched on their natural keys. Every save stamps
+the state with the pid of the process running the job and a heartbeat, so
+a job still being processed by another gunicorn worker is not offered for
+resuming.
+"""
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import User, Application, Event, EventSection, Attendance, Thread, Reply, Course
+
+logger = logging.getLogger(__name__)
+
+MERGE_CHUNK_SIZE = 500  # source rows per chunk (stays below SQLite's 999 bound parameters)
+
+RESTORE_JOBS_DIR = os.path.join(settings.BASE_DIR, 'database_backups', 'restore_jobs')
+# A queued or processing job whose heartbeat is older than this is considered interrupted
+RESTORE_JOB_STALE_SECONDS = 5 * 60
+
+# Merged tables in dependency order (parents before the rows that reference them)
+MERGE_TABLES = [
+    ('users', 'main_user'),
+    ('events', 'main_event'),
+    ('event_sections', 'main_eventsection'),
+    ('applications', 'main_application'),
+    ('attendance', 'main_attendance'),
+    ('threads', 'main_thread'),
+    ('replies', 'main_reply'),
+    ('courses', 'main_course'),
+]
+
+# Natural key fields each merged table is matched on
+NATURAL_KEYS = {
+    'users': (User, ('username',)),
+    'events': (Event, ('title', 'start_date')),
+    'event_sections': (EventSection, ('event_id', 'section_code')),
+    'applications': (Application, ('student_id',)),
+    'attendance': (Attendance, ('event_id', 'student_id')),
+    'threads': (Thread, ('title',)),
+    'replies': (Reply, ('thread_id', 'user_id', 'content')),
+    'courses': (Course, ('course_id',)),
+}
+
+# Every table reported in the restore summary, including the ones that are never merged
+STATS_TABLES = [
+    'users', 'applications', 'exchange_apps', 'events', 'attendance', 'threads',
+    'replies', 'dean_lists', 'dean_students', 'courses', 'event_sections',
+]
+
+
+def _aware_datetime(value, default=None):
+    """Parse an ISO datetime string from SQLite into a timezone-aware datetime"""
+    if value and isinstance(value, str):
+        try:
+            return timezone.make_aware(datetime.fromisoformat(value.replace('Z', '+00:00')))
+        except (ValueError, TypeError):
+            return default
+    return value or default
+
+
+def _as_date(value):
+    """Dates come back from SQLite as 'YYYY-MM-DD' strings"""
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return value
+    return value
+
+
+class SQLiteMerge:
+    """
+    Merge an uploaded SQLite database into the current database.
+
+    Usage:
+        merge = SQLiteMerge(path)
+        try:
+            stats = merge.run()
+        finally:
+            merge.close()
+
+    stats maps each table to {'added': n, 'skipped': n}; a failing table stops
+    at its last committed chunk and is reported in merge.warnings instead of
+    aborting the import. run() can resume from a checkpoint
+    {'table': name, 'rowid': n} and reports one after every committed chunk.
+    """
+
+    def __init__(self, source_path, chunk_size=MERGE_CHUNK_SIZE, stats=None, warnings=None):
+        self.source = sqlite3.connect(source_path)
+        self.source.row_factory = sqlite3.Row
+        self.chunk_size = chunk_size
+        self.stats = stats or {table: {'added': 0, 'skipped': 0} for table in STATS_TABLES}
+        self.warnings = warnings or []
+        self._id_maps = {}
+
+    def close(self):
+        self.source.close()
+
+    def run(self, checkpoint=None, on_chunk=None):
+        """
+        Merge every table, starting after checkpoint if given.
+
+        on_chunk(table, rowid) is called after each chunk is committed.
+        """
+        tables = [table for table, _ in MERGE_TABLES]
+        start = tables.index(checkpoint['table']) if checkpoint else 0
+        for table, source_table in MERGE_TABLES[start:]:
+            after_rowid = checkpoint['rowid'] if checkpoint and table == checkpoint['table'] else 0
+            self.merge_table(table, source_table, after_rowid, on_chunk)
+
+        # bulk_create sends no post_save signals
+        from .context_processors import invalidate_user_stats
+        invalidate_user_stats()
+        return self.stats
+
+    def merge_table(self, table, source_table, after_rowid=0, on_chunk=None):
+        """Merge one table chunk by chunk, each chunk in its own transaction"""
+        merge_rows = getattr(self, f'_merge_{table}')
+        committed = dict(self.stats[table])
+        try:
+            keys = self._existing_keys(table)
+            for rows, last_rowid in self.source_chunks(source_table, after_rowid):
+                with transaction.atomic():
+                    merge_rows(rows, keys)
+                committed = dict(self.stats[table])
+                if on_chunk:
+                    on_chunk(table, last_rowid)
+        except Exception as e:
+            # Counts of a rolled back chunk don't stand
+            self.stats[table] = committed
+            self.warnings.append(f"{table.replace('_', ' ').title()} import issue: {str(e)}")
+            logger.warning(f"Merge of {table} failed: {e}")
+        finally:
+            # Parent id maps are rebuilt after their table changes
+            self._id_maps.pop(table, None)
+
+    def source_chunks(self, source_table, after_rowid=0):
+        """Yield (rows as dicts, last rowid) for a source table, chunk_size rows at a time in rowid order"""
+        last_rowid = after_rowid
+        while True:
+            rows = self.source.execute(
+                f'SELECT rowid AS _rowid, * FROM {source_table} WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                (last_rowid, self.chunk_size)
+            ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1]['_rowid']
+            yield [dict(row) for row in rows], last_rowid
+
+    def _bulk_create(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.chunk_size, ignore_conflicts=True)
+
+    def _count_inserted(self, table, objects):
+        """
+        Bulk insert objects and record them as added, or as skipped when
+        their natural key was stored meanwhile or a conflict dropped them
+        (ignore_conflicts drops them silently).
+
+        Only the chunk's own natural keys are looked up, before and after the
+        insert, never the whole table.
+        """
+        if not objects:
+            return
+        model, fields = NATURAL_KEYS[table]
+
+        def natural_key(obj):
+            return tuple(getattr(obj, field) for field in fields)
+
+        # Rows written by another connection since the keys were loaded
+        stored = self._stored_keys(model, fields, {natural_key(obj) for obj in objects})
+        new_objects = [obj for obj in objects if natural_key(obj) not in stored]
+        self._bulk_create(model, new_objects)
+
+        inserted = len(self._stored_keys(model, fields, {natural_key(obj) for obj in new_objects})) if new_objects else 0
+        self.stats[table]['added'] += inserted
+        self.stats[table]['skipped'] += len(objects) - inserted
+
+    def _stored_keys(self, model, fields, keys):
+        """Which of keys (tuples of fields values) are in the target table"""
+        lookups = {f'{field}__in': {key[i] for key in keys} for i, field in enumerate(fields)}
+        return keys & set(model.objects.filter(**lookups).values_list(*fields))
+
+    # --- natural keys already in the target database ---
+
+    def _existing_keys(self, table):
+        model, fields = NATURAL_KEYS[table]
+        return set(model.objects.values_list(*fields, flat=len(fields) == 1))
+
+    # --- source id -> target id maps, built once per parent table ---
+
+    def _id_map(self, table):
+        if table not in self._id_maps:
+            self._id_maps[table] = getattr(self, f'_build_{table}_map')()
+        return self._id_maps[table]
+
+    def _build_users_map(self):
+        target = dict(User.objects.values_list('username', 'id'))
+        return {
+            row['id']: target[row['username']]
+            for row in self.source.execute('SELECT id, username FROM main_user')
+            if row['username'] in target
+        }
+
+    def _build_events_map(self):
+        target = {(title, start_date): pk for pk, title, start_date in
+                  Event.objects.values_list('id', 'title', 'start_date')}
+        id_map = {}
+        for row in self.source.execute('SELECT id, title, start_date FROM main_event'):
+            target_id = target.get((row['title'], _as_date(row['start_date'])))
+            if target_id:
+                id_map[row['id']] = target_id
+        return id_map
+
+    def _build_event_sections_map(self):
+        events = self._id_map('events')
+        target = {(event_id, code): pk for pk, event_id, code in
+                  EventSection.objects.values_list('id', 'event_id', 'section_code')}
+        id_map = {}
+        for row in self.source.execute('SELECT id, event_id, section_code FROM main_eventsection'):
+            target_id = target.get((events.get(row['event_id']), row['section_code']))
+            if target_id:
+                id_map[row['id']] = target_id
+        return id_map
+
+    def _build_threads_map(self):
+        # Oldest first so the most recent thread wins for duplicate titles
+        target = dict(Thread.objects.order_by('created_at').values_list('title', 'id'))
+        return {
+            row['id']: target[row['title']]
+            for row in self.source.execute('SELECT id, title FROM main_thread')
+            if row['title'] in target
+        }
+
+    # --- per-table merges: skip rows whose natural key exists, bulk insert the rest ---
+
+    def _merge_users(self, rows, keys):
+        new_users = []
+        for row in rows:
+            username = row.get('username', '')
+            if username and username not in keys:
+                keys.add(username)
+                new_users.append(User(
+                    username=username,
+                    password=row.get('password', ''),
+                    last_login=_aware_datetime(row.get('last_login')),
+                    is_superuser=bool(row.get('is_superuser', 0)),
+                    first_name=row.get('first_name', ''),
+                    last_name=row.get('last_name', ''),
+                    email=row.get('email', ''),
+                    is_staff=bool(row.get('is_staff', 0)),
+                    is_active=bool(row.get('is_active', 1)),
+                    date_joined=_aware_datetime(row.get('date_joined'), default=timezone.now()),
+                    is_member=bool(row.get('is_member', 0)),
+                    role=row.get('role', 'MEMBER'),
+                    is_admin=bool(row.get('is_admin', 0)),
+                    is_exchange_officer=bool(row.get('is_exchange_officer', 0))
+                ))
+            else:
+                self.stats['users']['skipped'] += 1
+        self._count_inserted('users', new_users)
+
+    def _merge_events(self, rows, keys):
+        new_events = []
+        for row in rows:
+            title = row.get('title', '')
+            start_date = row.get('start_date')
+            if not (title and start_date):
+                continue
+            key = (title, _as_date(start_date))
+            if key in keys:
+                self.stats['events']['skipped'] += 1
+                continue
+            keys.add(key)
+            event = Event(
+                title=title,
+                description=row.get('description', ''),
+                start_date=key[1],
+                end_date=row.get('end_date', start_date),  # Default to start_date if missing
+                start_time=row.get('start_time'),
+                end_time=row.get('end_time'),
+                image_url=row.get('image_url', ''),
+                secret_start_a=row.get('secret_start_a'),
+                secret_start_b=row.get('secret_start_b'),
+                secret_start_c=row.get('secret_start_c'),
+                secret_end_a=row.get('secret_end_a'),
+                secret_end_b=row.get('secret_end_b'),
+                secret_end_c=row.get('secret_end_c')
+            )
+            # bulk_create skips Event.save(), which fills in missing check-in/out secrets
+            if None in (event.secret_start_a, event.secret_start_b, event.secret_start_c):
+                event.secret_start_a, event.secret_start_b, event.secret_start_c = event._generate_triplet()
+            if None in (event.secret_end_a, event.secret_end_b, event.secret_end_c):
+                event.secret_end_a, event.secret_end_b, event.secret_end_c = event._generate_triplet()
+            new_events.append(event)
+        self._count_inserted('events', new_events)
+
+    def _merge_event_sections(self, rows, keys):
+        events = self._id_map('events')
+        new_sections = []
+        for row in rows:
+            event_id = events.get(row.get('event_id'))
+            if not event_id:
+                continue
+            key = (event_id, row.get('section_code', ''))
+            if key in keys:
+                self.stats['event_sections']['skipped'] += 1
+                continue
+            keys.add(key)
+            new_sections.append(EventSection(
+                event_id=event_id,
+                section_code=key[1],
+                professor_name=row.get('professor_name', '')
+            ))
+        self._count_inserted('event_sections', new_sections)
+
+    def _merge_applications(self, rows, keys):
+        new_applications = []
+        for row in rows:
+            student_id = row.get('student_id', '')
+            if student_id and student_id not in keys:
+                keys.add(student_id)
+                new_applications.append(Application(
+                    student_id=student_id,
+                    name=row.get('name', ''),
+                    email=row.get('email', ''),
+                    phone=row.get('phone', ''),
+                    passed_credits=row.get('passed_credits', 0),
+                    GPA=row.get('GPA', 0.0),
+                    major=row.get('major', ''),
+                    anything_else=row.get('anything_else', '')
+                ))
+            else:
+                self.stats['applications']['skipped'] += 1
+        self._count_inserted('applications', new_applications)
+
+    def _merge_attendance(self, rows, keys):
+        events = self._id_map('events')
+        new_attendances = []
+        source_ids = {}  # (target event id, student_id) -> source attendance id
+        for row in rows:
+            event_id = events.get(row.get('event_id'))
+            if not event_id:
+                continue
+            student_id = row.get('student_id', '')
+            key = (event_id, student_id)
+            if not student_id or key in keys:
+                self.stats['attendance']['skipped'] += 1
+                continue
+            keys.add(key)
+            source_ids[key] = row['id']
+            new_attendances.append(Attendance(
+                event_id=event_id,
+                student_id=student_id,
+                student_name=row.get('student_name', ''),
+                email=row.get('email', ''),
+                code=row.get('code', ''),
+                present_start=bool(row.get('present_start', 0)),
+                present_end=bool(row.get('present_end', 0))
+            ))
+        self._count_inserted('attendance', new_attendances)
+        if new_attendances:
+            self._merge_attendance_sections(source_ids)
+
+    def _merge_attendance_sections(self, source_ids):
+        """Copy the section links of newly added attendances (ids read back in one query)"""
+        sections = self._id_map('event_sections')
+        added = Attendance.objects.filter(
+            event_id__in={event_id for event_id, _ in source_ids},
+            student_id__in={student_id for _, student_id in source_ids},
+        ).values_list('id', 'event_id', 'student_id')
+        target_ids = {source_ids[(event_id, student_id)]: pk
+                      for pk, event_id, student_id in added if (event_id, student_id) in source_ids}
+
+        placeholders = ','.join('?' * len(target_ids))
+        try:
+            links = self.source.execute(
+                f'SELECT attendance_id, eventsection_id FROM main_attendance_sections '
+                f'WHERE attendance_id IN ({placeholders})',
+                list(target_ids)
+            ).fetchall()
+        except sqlite3.Error:
+            # If sections import fails, continue without them
+            return
+
+        through = Attendance.sections.through
+        self._bulk_create(through, [
+            through(attendance_id=target_ids[attendance_id], eventsection_id=sections[section_id])
+            for attendance_id, section_id in links
+            if section_id in sections
+        ])
+
+    def _merge_threads(self, rows, keys):
+        new_threads = []
+        for row in rows:
+            title = row.get('title', '')
+            if title and title not in keys:
+                keys.add(title)
+                new_threads.append(Thread(
+                    title=title,
+                    content=row.get('content', ''),
+                    is_resolved=bool(row.get('is_resolved', 0))
+                ))
+            else:
+                self.stats['threads']['skipped'] += 1
+        self._count_inserted('threads', new_threads)
+
+    def _merge_replies(self, rows, keys):
+        threads = self._id_map('threads')
+        users = self._id_map('users')
+        new_replies = []
+        for row in rows:
+            if not (row.get('thread_id') and row.get('user_id')):
+                continue
+            thread_id = threads.get(row['thread_id'])
+            user_id = users.get(row['user_id'])
+            key = (thread_id, user_id, row.get('content', ''))
+            if not (thread_id and user_id) or key in keys:
+                self.stats['replies']['skipped'] += 1
+                continue
+            keys.add(key)
+            new_replies.append(Reply(thread_id=thread_id, user_id=user_id, content=key[2]))
+        self._count_inserted('replies', new_replies)
+
+    def _merge_courses(self, rows, keys):
+        new_courses = []
+        for row in rows:
+            course_id = row.get('course_id', '')
+            if course_id and course_id not in keys:
+                keys.add(course_id)
+                new_courses.append(Course(
+                    course_id=course_id,
+                    course_name=row.get('course_name', ''),
+                    syllabus_url=row.get('syllabus_url', ''),
+                    info_url=row.get('info_url', ''),
+                    department=row.get('department', ''),
+                    credits=row.get('credits'),
+                    is_active=bool(row.get('is_active', 1))
+                ))
+            else:
+                self.stats['courses']['skipped'] += 1
+        self._count_inserted('courses', new_courses)
+
+
+# --- background restore jobs ---
+
+def _restore_job_path(job_id, extension):
+    # job ids are uuid4 hex strings; anything else could escape the jobs directory
+    if not isinstance(job_id, str) or len(job_id) != 32 or not all(c in '0123456789abcdef' for c in job_id):
+        raise ValueError('Invalid restore job id')
+    return os.path.join(RESTORE_JOBS_DIR, f'{job_id}.{extension}')
+
+
+def load_restore_job(job_id):
+    """Return the saved state of a restore job, or None if there is no such job"""
+    try:
+        with open(_restore_job_path(job_id, 'json'), encoding='utf-8') as state_file:
+            return json.load(state_file)
+    except (ValueError, OSError):
+        return None
+
+
+def save_restore_job(state):
+    """
+    Write a job's state atomically so a crash never leaves a half-written
+    checkpoint, stamped with the owning process and a heartbeat.
+    """
+    state['owner_pid'] = os.getpid()
+    state['heartbeat'] = time.time()
+    path = _restore_job_path(state['job_id'], 'json')
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as state_file:
+        json.dump(state, state_file)
+    os.replace(tmp_path, path)
+
+
+def create_restore_job(uploaded_path, username=''):
+    """Move an uploaded SQLite file into the jobs directory and queue a restore job for it"""
+    os.makedirs(RESTORE_JOBS_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    shutil.move(uploaded_path, _restore_job_path(job_id, 'sqlite3'))
+    state = {
+        'job_id': job_id,
+        'status': 'queued',
+        'message': 'Waiting for the restore worker...',
+        'user': username,
+        'created_at': timezone.now().isoformat(),
+        'checkpoint': None,
+        'progress': 0,
+        'stats': {table: {'added': 0, 'skipped': 0} for table in STATS_TABLES},
+        'warnings': [],
+    }
+    save_restore_job(state)
+    return job_id
+
+
+def _process_alive(pid):
+    if os.name == 'nt':  # os.kill would terminate the process there, rely on the heartbeat
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        pass
+    return True
+
+
+def restore_job_resumable(state):
+    """
+    True if nobody is working on the job any more: it failed, or it is
+    queued/processing but its owner process is gone or its heartbeat is stale.
+    """
+    if state['status'] == 'error':
+        return True
+    if state['status'] not in ('queued', 'processing'):
+        return False
+    heartbeat = state.get('heartbeat')
+    if heartbeat is None or time.time() - heartbeat > RESTORE_JOB_STALE_SECONDS:
+        return True
+    return not _process_alive(state['owner_pid'])
+
+
+def incomplete_restore_jobs():
+    """States of the jobs that can be resumed (interrupted or failed), newest first"""
+    if not os.path.isdir(RESTORE_JOBS_DIR):
+        return []
+    jobs = []
+    for filename in os.listdir(RESTORE_JOBS_DIR):
+        if filename.endswith('.json'):
+            state = load_restore_job(filename[:-len('.json')])
+            if state and restore_job_resumable(state):
+                jobs.append(state)
+    return sorted(jobs, key=lambda state: state.get('created_at', ''), reverse=True)
+
+
+def run_restore_job(job_id):
+    """Run (or resume from its checkpoint) a restore job, saving a checkpoint after every chunk"""
+    state = load_restore_job(job_id)
+    if state is None:
+        raise ValueError(f'Unknown restore job {job_id}')
+    source_path = _restore_job_path(job_id, 'sqlite3')
+
+    tables = [table for table, _ in MERGE_TABLES]
+    state['status'] = 'processing'
+    state['message'] = 'Resuming import...' if state['checkpoint'] else 'Importing data...'
+    save_restore_job(state)
+
+    merge = SQLiteMerge(source_path, stats=state['stats'], warnings=state['warnings'])
+    try:
+        def save_checkpoint(table, rowid):
+            state['checkpoint'] = {'table': table, 'rowid': rowid}
+            state['progress'] = int(tables.index(table) * 100 / len(tables))
+            state['message'] = f"Importing {table.replace('_', ' ')}..."
+            save_restore_job(state)
+
+        merge.run(checkpoint=state['checkpoint'], on_chunk=save_checkpoint)
+    finally:
+        merge.close()
+
+    total_added = sum(s['added'] for s in state['stats'].values())
+    total_skipped = sum(s['skipped'] for s in state['stats'].values())
+    state['status'] = 'completed'
+    state['progress'] = 100
+    state['message'] = f'Data import completed! Added {total_added} records, skipped {total_skipped} duplicates.'
+    save_restore_job(state)
+
+    # The upload is only needed to resume
+    if os.path.exists(source_path):
+        os.unlink(source_path)
+    return state
+
+
+def fail_restore_job(job_id, error):
+    """Mark a job as failed (its upload and checkpoint are kept so it can be resumed)"""
+    state = load_restore_job(job_id)
+    if state is not None:
+        state['status'] = 'error'
+        state['message'] = f'Error importing database: {type(error).__name__}: {str(error)}'
+        save_restore_job(state)
@@ -0,0 +1,500 @@
+"""
+On-disk cache behind image_proxy.
+
+Upstream images are downloaded once through a pooled requests.Session and
+kept under IMAGE_PROXY_CACHE_DIR, one body file plus a small JSON metadata
+file per URL. Entries younger than IMAGE_PROXY_FRESH_SECONDS are served
+straight from disk, older ones are revalidated with If-None-Match /
+If-Modified-Since. The store is bounded by IMAGE_PROXY_CACHE_MAX_BYTES and
+evicts the least recently used bodies (their mtime is bumped on every hit).
+
+Misses are coalesced: only one thread or gunicorn worker fetches a given URL
+at a time (an flock on one of LOCK_BUCKETS lock files picked by the URL
+hash), the others wait for it and then read its result from disk. Upstream
+failures are remembered for IMAGE_PROXY_NEGATIVE_SECONDS so a broken link
+fails fast instead of costing every visitor a fetch timeout; at most
+MAX_FAILURE_RECORDS of them are kept.
+
+get_thumbnail adds resized WebP (or AVIF/JPEG) variants at the
+THUMBNAIL_WIDTHS breakpoints, rendered once with Pillow from the cached
+original and stored next to it under the same LRU bound.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: coalesce within the process only
+    fcntl = None
+
+# Hosts image_proxy fetches from, anything else is rejected
+PROXY_ALLOWED_HOSTS = [
+    'photos.fife.usercontent.google.com',
+    'lh3.googleusercontent.com',
+    'drive.google.com',
+]
+
+FETCH_TIMEOUT = 10
+# How long a request waits for another worker's fetch of the same URL
+LOCK_TIMEOUT = 30
+# URLs share lock files by the first hex digits of their hash, so the number
+# of lock files stays bounded (256) however many URLs are requested
+LOCK_BUCKET_DIGITS = 2
+# Upper bound on remembered upstream failures, the oldest go first
+MAX_FAILURE_RECORDS = 1000
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Thumbnail breakpoints, requested widths are rounded up to one of them
+THUMBNAIL_WIDTHS = [160, 320, 480, 640, 960, 1280]
+# format -> (Pillow format, content type)
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'avif': ('AVIF', 'image/avif'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+THUMBNAIL_QUALITY = 80
+
+_session = None
+_session_lock = threading.Lock()
+_evict_lock = threading.Lock()
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+class UpstreamImageError(Exception):
+    """The upstream host could not be reached or did not return the image"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CachedImage:
+    """A cached image body on disk and the metadata needed to serve it"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+
+    @property
+    def content_type(self):
+        return self.meta.get('content_type') or 'application/octet-stream'
+
+    @property
+    def size(self):
+        return self.meta.get('size', 0)
+
+    @property
+    def etag(self):
+        return '"%s"' % self.meta['content_hash'][:32]
+
+    def open(self):
+        return open(self.path, 'rb')
+
+
+def get_session():
+    """requests.Session shared by all upstream image fetches (keep-alive connection pool)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def cache_dir():
+    directory = str(settings.IMAGE_PROXY_CACHE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _cache_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _entry_base(url):
+    """Path of the cache entry of url, without extension"""
+    return os.path.join(cache_dir(), _cache_key(url))
+
+
+def _subdir(name):
+    directory = os.path.join(cache_dir(), name)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _failure_path(url):
+    """Failure records live in their own directory so pruning them does not scan the bodies"""
+    return os.path.join(_subdir('failures'), _cache_key(url) + '.neg')
+
+
+def _lock_path(url):
+    return os.path.join(_subdir('locks'), _cache_key(url)[:LOCK_BUCKET_DIGITS] + '.lock')
+
+
+def load_cached_image(url):
+    """The cached entry for url, or None"""
+    base = _entry_base(url)
+    body_path, meta_path = base + '.bin', base + '.json'
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('url') != url or not os.path.exists(body_path):
+        return None
+    return CachedImage(body_path, meta)
+
+
+def _write_meta(meta_path, meta):
+    temp_path = f'{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(temp_path, meta_path)
+
+
+def _touch(image):
+    """Mark the entry as recently used for the LRU eviction"""
+    try:
+        os.utime(image.path)
+    except OSError:
+        pass
+
+
+def _is_fresh(image):
+    fresh_seconds = getattr(settings, 'IMAGE_PROXY_FRESH_SECONDS', 3600)
+    return image is not None and time.time() - image.meta.get('checked_at', 0) < fresh_seconds
+
+
+def _recent_failure(url):
+    """The remembered upstream failure of url, None if there is none or it expired"""
+    try:
+        with open(_failure_path(url), encoding='utf-8') as f:
+            failure = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if failure.get('url') != url or failure.get('until', 0) < time.time():
+        return None
+    return failure
+
+
+def _record_failure(url, message, status_code=None):
+    negative_seconds = getattr(settings, 'IMAGE_PROXY_NEGATIVE_SECONDS', 300)
+    failure = {
+        'url': url,
+        'message': message,
+        'status_code': status_code,
+        'until': time.time() + negative_seconds,
+    }
+    _write_meta(_failure_path(url), failure)
+    _prune_failures()
+    return failure
+
+
+def _prune_failures(max_records=MAX_FAILURE_RECORDS):
+    """Delete expired failure records, then the oldest ones beyond max_records"""
+    negative_seconds = getattr(settings, 'IMAGE_PROXY_NEGATIVE_SECONDS', 300)
+    now = time.time()
+    records = []
+    for entry in os.scandir(_subdir('failures')):
+        try:
+            mtime = entry.stat().st_mtime
+            if mtime < now - negative_seconds:
+                os.remove(entry.path)
+            else:
+                records.append((mtime, entry.path))
+        except OSError:
+            pass
+
+    if len(records) > max_records:
+        records.sort()
+        for _mtime, path in records[:len(records) - max_records]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+@contextmanager
+def single_flight(url):
+    """Hold the fetch lock of url (and its lock bucket), shared by all threads and gunicorn workers"""
+    lock_path = _lock_path(url)
+    if fcntl is None:
+        with _thread_locks_guard:
+            lock = _thread_locks.setdefault(lock_path, threading.Lock())
+        if not lock.acquire(timeout=LOCK_TIMEOUT):
+            raise UpstreamImageError('Timed out waiting for the image')
+        try:
+            yield
+        finally:
+            lock.release()
+        return
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    with open(lock_path, 'a') as lock_file:
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    raise UpstreamImageError('Timed out waiting for the image')
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _fail_or_stale(cached, failure):
+    """Serve the stale copy of a failing URL, or raise its failure"""
+    if cached:
+        _touch(cached)
+        return cached
+    raise UpstreamImageError(failure['message'], failure.get('status_code'))
+
+
+def get_cached_image(url):
+    """
+    Return a CachedImage for url, downloading or revalidating it as needed.
+    Raises UpstreamImageError when the image is unavailable and not cached.
+    """
+    cached = load_cached_image(url)
+    if _is_fresh(cached):
+        _touch(cached)
+        return cached
+    failure = _recent_failure(url)
+    if failure:
+        return _fail_or_stale(cached, failure)
+
+    with single_flight(url):
+        # Whoever held the lock before us may have just fetched it
+        cached = load_cached_image(url)
+        if _is_fresh(cached):
+            _touch(cached)
+            return cached
+        failure = _recent_failure(url)
+        if failure:
+            return _fail_or_stale(cached, failure)
+        return _fetch(url, cached)
+
+
+def _fetch(url, cached):
+    """Download or revalidate url, the caller holds its single_flight lock"""
+    headers = {}
+    if cached:
+        if cached.meta.get('etag'):
+            headers['If-None-Match'] = cached.meta['etag']
+        if cached.meta.get('last_modified'):
+            headers['If-Modified-Since'] = cached.meta['last_modified']
+
+    try:
+        response = get_session().get(url, headers=headers, stream=True, timeout=FETCH_TIMEOUT)
+    except requests.RequestException as e:
+        # Upstream is down: remember it, and a stale image beats a broken one
+        return _fail_or_stale(cached, _record_failure(url, f'Error fetching image: {e}'))
+
+    with response:
+        if cached and response.status_code == 304:
+            cached.meta['checked_at'] = time.time()
+            _write_meta(_entry_base(url) + '.json', cached.meta)
+            _touch(cached)
+            return cached
+
+        if response.status_code != 200:
+            failure = _record_failure(url, 'Upstream returned %s' % response.status_code, response.status_code)
+            return _fail_or_stale(cached, failure)
+
+        try:
+            return _store(url, response)
+        except UpstreamImageError as e:
+            _record_failure(url, str(e))
+            raise
+
+
+def _store(url, response):
+    """Stream the upstream body to disk and record its metadata"""
+    base = _entry_base(url)
+    body_path, meta_path = base + '.bin', base + '.json'
+    max_bytes = getattr(settings, 'IMAGE_PROXY_MAX_IMAGE_BYTES', 20 * 1024 * 1024)
+    temp_path = f'{body_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UpstreamImageError('Image is too large')
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(temp_path, body_path)
+    except requests.RequestException as e:
+        raise UpstreamImageError(f'Error fetching image: {e}')
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    meta = {
+        'url': url,
+        'content_type': response.headers.get('Content-Type', 'application/octet-stream'),
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'content_hash': digest.hexdigest(),
+        'size': size,
+        'checked_at': time.time(),
+    }
+    _write_meta(meta_path, meta)
+    if os.path.exists(_failure_path(url)):
+        os.remove(_failure_path(url))
+    evict_cached_images()
+    return CachedImage(body_path, meta)
+
+
+def thumbnail_width(width):
+    """The breakpoint to render for a requested width"""
+    try:
+        width = int(width)
+    except (TypeError, ValueError):
+        return THUMBNAIL_WIDTHS[-1]
+    for breakpoint in THUMBNAIL_WIDTHS:
+        if width <= breakpoint:
+            return breakpoint
+    return THUMBNAIL_WIDTHS[-1]
+
+
+def thumbnail_format(fmt):
+    """The output format for a requested one, WebP unless another supported format is asked for"""
+    fmt = (fmt or 'webp').lower()
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    if fmt not in THUMBNAIL_FORMATS:
+        return 'webp'
+    if fmt == 'avif' and not features.check('avif'):
+        # Pillow only encodes AVIF from 11.3 on (or with pillow-avif-plugin)
+        return 'webp'
+    return fmt
+
+
+def get_thumbnail(url, width=None, fmt=None):
+    """
+    Return a CachedImage with url resized to a THUMBNAIL_WIDTHS breakpoint
+    in fmt, rendering it on first use. Images are never enlarged, and bodies
+    Pillow can't read are served as they are.
+    """
+    original = get_cached_image(url)
+    width = thumbnail_width(width)
+    fmt = thumbnail_format(fmt)
+
+    # Named after the original's content so a changed upstream image gets new thumbnails
+    variant = f'w{width}.{fmt}'
+    content_hash = original.meta['content_hash']
+    thumbnail = CachedImage(
+        f'{_entry_base(url)}.{content_hash[:16]}.{variant}.bin',
+        {
+            'content_type': THUMBNAIL_FORMATS[fmt][1],
+            'content_hash': hashlib.sha256(f'{content_hash}:{variant}'.encode('utf-8')).hexdigest(),
+        },
+    )
+    if not os.path.exists(thumbnail.path):
+        with single_flight(f'{url}#{variant}'):
+            if not os.path.exists(thumbnail.path):
+                try:
+                    _render_thumbnail(original.path, thumbnail.path, width, fmt)
+                except (OSError, ValueError, Image.DecompressionBombError):
+                    # Not an image Pillow can decode (e.g. an HTML error page)
+                    return original
+                evict_cached_images()
+    _touch(thumbnail)
+    return thumbnail
+
+
+def _render_thumbnail(source_path, target_path, width, fmt):
+    pillow_format = THUMBNAIL_FORMATS[fmt][0]
+    temp_path = f'{target_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with Image.open(source_path) as source:
+            image = ImageOps.exif_transpose(source)
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            if fmt == 'jpeg' or not has_alpha:
+                image = image.convert('RGB')
+            else:
+                image = image.convert('RGBA')
+
+            options = {'quality': THUMBNAIL_QUALITY}
+            if fmt == 'jpeg':
+                options.update(optimize=True, progressive=True)
+            elif fmt == 'webp':
+                options['method'] = 4
+            image.save(temp_path, pillow_format, **options)
+        os.replace(temp_path, target_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def evict_cached_images(max_bytes=None):
+    """Delete the least recently used entries until the cache fits in max_bytes"""
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'IMAGE_PROXY_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+
+    with _evict_lock:
+        entries = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(cache_dir()):
+            if entry.name.endswith(('.neg', '.lock')):
+                # Per-URL failure records and lock files of earlier versions, now kept in subdirectories
+                try:
+                    if entry.stat().st_mtime < now - 86400:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+                continue
+            if not entry.name.endswith('.bin'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= max_bytes:
+                break
+            for stale_path in (path, path[:-len('.bin')] + '.json'):
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    pass
+            total -= size
+
+
+def iter_file(f, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """Yield an open file in chunks and close it at the end"""
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,125 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from main.models import DeanListStudent
+from main.utils import merged_dean_list_rows
+
+
+class RollbackBenchmark(Exception):
+    """Raised to undo the temporary index drops made for the baseline run"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Report query plans and timings for the hot DeanListStudent queries "
+        "(dean's list page, student search, merged list, parking eligibility). "
+        "With --compare the same queries are also run with the composite/trigram "
+        "indexes dropped inside a transaction that is rolled back afterwards."
+    )
+
+    # Indexes added by migration 0036 that the --compare run drops temporarily
+    MODEL_INDEXES = ['deanlist_term_major_gpa_idx', 'deanlist_student_term_idx']
+    TRIGRAM_INDEX = 'deanlist_student_name_trgm_idx'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of times each query is run (default: 20)',
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Also run every query without the DeanListStudent indexes (before/after)',
+        )
+        parser.add_argument(
+            '--no-plans',
+            action='store_true',
+            help='Only print timings, not query plans',
+        )
+
+    def handle(self, *args, **options):
+        sample = DeanListStudent.objects.order_by('-year', 'semester').values(
+            'semester', 'year', 'student_major', 'student_id', 'student_name'
+        ).first()
+        if not sample:
+            self.stdout.write("No DeanListStudent records found - import a dean's list first.")
+            return
+
+        name_word = (sample['student_name'].split() or [sample['student_name']])[0]
+        queries = self.build_queries(sample, name_word)
+
+        self.stdout.write(f"Database: {connection.vendor}")
+        self.stdout.write(f"Records: {DeanListStudent.objects.count()}")
+        self.stdout.write(f"Sample: {sample['semester']} {sample['year']}, major '{sample['student_major']}', "
+                          f"student {sample['student_id']}, name word '{name_word}'")
+
+        with_indexes = self.run_queries(queries, options['repeat'], not options['no_plans'], 'WITH INDEXES')
+
+        if options['compare']:
+            without_indexes = {}
+            try:
+                with transaction.atomic():
+                    self.drop_indexes()
+                    without_indexes = self.run_queries(queries, options['repeat'], not options['no_plans'], 'WITHOUT INDEXES')
+                    raise RollbackBenchmark()
+            except RollbackBenchmark:
+                pass
+
+            self.stdout.write("\n=== SUMMARY (median ms) ===")
+            self.stdout.write(f"{'Query':<32}{'without':>10}{'with':>10}{'speedup':>10}")
+            for label in queries:
+                before = without_indexes[label]
+                after = with_indexes[label]
+                speedup = f"{before / after:.1f}x" if after else '-'
+                self.stdout.write(f"{label:<32}{before:>10.2f}{after:>10.2f}{speedup:>10}")
+
+    def build_queries(self, sample, name_word):
+        """The querysets issued by the views that filter DeanListStudent"""
+        semester = sample['semester']
+        year = sample['year']
+        return {
+            'deanslist (semester/year)': DeanListStudent.objects.filter(
+                semester=semester, year=year
+            ).order_by('student_major', '-gpa', '-passed_credits', 'student_name'),
+            'deanslist (major)': DeanListStudent.objects.filter(
+                semester=semester, year=year, student_major=sample['student_major']
+            ).order_by('-gpa'),
+            'student_search (id)': DeanListStudent.objects.filter(
+                student_id=sample['student_id']
+            ).order_by('year', 'semester'),
+            'student_search (name)': DeanListStudent.objects.filter(
+                student_name__icontains=name_word
+            ).order_by('student_name', 'year', 'semester'),
+            'merged_deans_list': merged_dean_list_rows(year),
+            'parking eligibility': DeanListStudent.objects.filter(
+                student_id=sample['student_id'], semester=semester, year=year
+            ).values('id')[:1],
+        }
+
+    def run_queries(self, queries, repeat, show_plans, title):
+        """Time every query and return {label: median milliseconds}"""
+        self.stdout.write(f"\n=== {title} ===")
+        medians = {}
+        for label, queryset in queries.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            medians[label] = statistics.median(timings)
+
+            self.stdout.write(f"\n{label}: median {medians[label]:.2f} ms, min {min(timings):.2f} ms")
+            if show_plans:
+                for line in queryset.explain().splitlines():
+                    self.stdout.write(f"    {line}")
+        return medians
+
+    def drop_indexes(self):
+        """Drop the DeanListStudent indexes (call inside a transaction that is rolled back)"""
+        with connection.cursor() as cursor:
+            for name in self.MODEL_INDEXES + [self.TRIGRAM_INDEX]:
+                cursor.execute(f'DROP INDEX IF EXISTS {name}')
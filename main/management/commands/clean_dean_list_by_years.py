@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
-from main.models import DeanListStudent
+from main.context_processors import invalidate_user_stats
+from main.models import DeanList, DeanListStudent
+from main.utils import invalidate_merged_dean_list, update_dean_list_rankings
 
 
 class Command(BaseCommand):
@@ -119,6 +121,13 @@ class Command(BaseCommand):
                             self.stderr.write(f"Error deleting record ID {record['student'].id}: {str(e)}")
                     
                     self.stdout.write(self.style.SUCCESS(f"Deleted {deleted_count} invalid records from year {year}"))
+
+                    invalidate_user_stats()
+                    invalidate_merged_dean_list(year)
+
+                    # Close the gaps left in the stored rankings
+                    for dean_list in DeanList.objects.filter(year=year):
+                        update_dean_list_rankings(dean_list)
                     total_deleted += deleted_count
                 else:
                     self.stdout.write(f"DRY RUN: Would delete {len(invalid_records)} records from year {year}")
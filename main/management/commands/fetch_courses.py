@@ -1,11 +1,89 @@
 import requests
 from bs4 import BeautifulSoup
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from main.course_search import invalidate_course_index
 from main.models import Course
+import hashlib
+import json
+import os
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, parse_qs, urlparse
 
+CMU_COURSE_LIST_URL = "https://cmu.cba.ku.edu.kw/aolapp/syllabus/list/approved/"
+# Bump when the page parsing changes so cached parse results are not reused
+PAGE_CACHE_VERSION = 1
+# Course fields that come from the CMU site, compared when applying a staged catalog
+SYNCED_COURSE_FIELDS = ['course_name', 'syllabus_url', 'info_url', 'department', 'credits']
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: on average `rate` requests per second, with
+    bursts of up to `burst` requests after an idle period. A rate of 0
+    disables the limit.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class PageCache:
+    """
+    On-disk cache for conditional GETs. Each URL keeps its ETag,
+    Last-Modified, a hash of the body and the result parsed from that body,
+    so an unchanged page costs a 304 round trip and no parsing.
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, url):
+        try:
+            with open(self.path(url), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url or entry.get('version') != PAGE_CACHE_VERSION:
+            return None
+        return entry
+
+    def save(self, url, entry):
+        entry = dict(entry, url=url, version=PAGE_CACHE_VERSION)
+        path = self.path(url)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, path)
+
 
 class Command(BaseCommand):
     help = 'Fetch course data from CMU syllabus website'
@@ -16,31 +94,68 @@ class Command(BaseCommand):
             action='store_true',
             help='Update existing courses instead of skipping them',
         )
+        parser.add_argument(
+            '--base-url',
+            default=CMU_COURSE_LIST_URL,
+            help='Course list page to start from (point it at a local stub server for testing)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=getattr(settings, 'COURSE_FETCH_CONCURRENCY', 4),
+            help='Number of info pages fetched in parallel (default: COURSE_FETCH_CONCURRENCY)',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=getattr(settings, 'COURSE_FETCH_RATE', 4),
+            help='Maximum requests per second to the CMU server, 0 for no limit (default: COURSE_FETCH_RATE)',
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Stage the whole fetched catalog and apply it in one transaction: insert new courses, '
+                 'update changed ones and deactivate courses missing from the site',
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Download every page again instead of revalidating the cached copies (COURSE_PAGE_CACHE_DIR)',
+        )
 
     def handle(self, *args, **options):
-        base_url = "https://cmu.cba.ku.edu.kw/aolapp/syllabus/list/approved/"
+        base_url = options.get('base_url') or CMU_COURSE_LIST_URL
+        concurrency = max(1, options.get('concurrency') or 1)
+        sync = options.get('sync')
+        # Set by --sync once the staged catalog is applied (read by the background refresh)
+        self.sync_stats = None
+        staged = {}
+        
+        # One keep-alive connection pool shared by all workers, and a token bucket
+        # instead of a fixed sleep so parallel workers stay within the rate limit
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.rate_limiter = RateLimiter(options.get('rate') or 0, burst=concurrency)
+        
+        self.page_cache = None
+        if not options.get('no_cache'):
+            self.page_cache = PageCache(settings.COURSE_PAGE_CACHE_DIR)
+        self.cache_stats = {'not_modified': 0, 'unchanged': 0, 'parsed': 0}
+        self.cache_stats_lock = threading.Lock()
         
         try:
             self.stdout.write("Fetching course list from CMU website...")
             
             # Get the main page with course list
-            response = requests.get(base_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # DEBUG: Save HTML to file for inspection
-            with open('debug_cmu_page.html', 'w', encoding='utf-8') as f:
-                f.write(str(soup.prettify()))
-            self.stdout.write("Saved HTML to debug_cmu_page.html for inspection")
-            
-            # Look for course list items instead of tables
-            course_list = soup.find('ul', id='courseList')
-            if not course_list:
+            course_items = self.fetch_parsed(
+                base_url, lambda content: self.parse_course_list(content, base_url), timeout=30
+            )
+            if course_items is None:
                 self.stdout.write("No courseList found on the page")
                 return
                 
-            course_items = course_list.find_all('li')
             self.stdout.write(f"Found {len(course_items)} course items")
             
             if not course_items:
@@ -52,45 +167,54 @@ class Command(BaseCommand):
             created_count = 0
             error_count = 0
             
-            self.stdout.write(f"Found {total_courses} courses to process...")
+            self.stdout.write(f"Found {total_courses} courses to process ({concurrency} in parallel)...")
             
-            for i, item in enumerate(course_items, 1):
-                try:
-                    course_data = self.extract_course_data(item, base_url)
-                    
-                    if course_data:
-                        course, created = Course.objects.update_or_create(
-                            course_id=course_data['course_id'],
-                            defaults={
-                                'course_name': course_data['course_name'],
-                                'syllabus_url': course_data.get('syllabus_url'),
-                                'info_url': course_data.get('info_url'),
-                                'department': course_data.get('department'),
-                                'credits': course_data.get('credits'),
-                                'is_active': True,
-                            }
-                        )
+            # Workers only download and parse, the database writes stay on this thread
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = executor.map(self.add_syllabus_url, course_items)
+                
+                for i, course_data in enumerate(results, 1):
+                    try:
+                        if course_data and sync:
+                            staged[course_data['course_id']] = course_data
+                        elif course_data:
+                            course, created = Course.objects.update_or_create(
+                                course_id=course_data['course_id'],
+                                defaults={
+                                    'course_name': course_data['course_name'],
+                                    'syllabus_url': course_data.get('syllabus_url'),
+                                    'info_url': course_data.get('info_url'),
+                                    'department': course_data.get('department'),
+                                    'credits': course_data.get('credits'),
+                                    'is_active': True,
+                                }
+                            )
+                            
+                            if created:
+                                created_count += 1
+                                self.stdout.write(f"Created: {course.course_id}")
+                            else:
+                                updated_count += 1
+                                self.stdout.write(f"Updated: {course.course_id}")
                         
-                        if created:
-                            created_count += 1
-                            self.stdout.write(f"Created: {course.course_id}")
-                        else:
-                            updated_count += 1
-                            self.stdout.write(f"Updated: {course.course_id}")
-                    
-                    # Progress indicator
-                    if i % 10 == 0:
-                        self.stdout.write(f"Processed {i}/{total_courses} courses...")
-                    
-                    # Be respectful to the server
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    error_count += 1
-                    self.stdout.write(
-                        self.style.ERROR(f"Error processing course {i}: {str(e)}")
-                    )
-                    continue
+                        # Progress indicator
+                        if i % 10 == 0:
+                            self.stdout.write(f"Processed {i}/{total_courses} courses...")
+                        
+                    except Exception as e:
+                        error_count += 1
+                        self.stdout.write(
+                            self.style.ERROR(f"Error processing course {i}: {str(e)}")
+                        )
+                        continue
+            
+            if sync:
+                if not staged:
+                    self.stdout.write(self.style.ERROR("No courses fetched, the live catalog was left unchanged"))
+                    return
+                self.sync_stats = self.apply_staged_courses(staged)
+                created_count = self.sync_stats['created']
+                updated_count = self.sync_stats['updated']
             
             self.stdout.write(
                 self.style.SUCCESS(
@@ -100,6 +224,16 @@ class Command(BaseCommand):
                     f"Errors: {error_count}"
                 )
             )
+            if sync:
+                self.stdout.write(
+                    f"Deactivated: {self.sync_stats['deactivated']}\n"
+                    f"Unchanged: {self.sync_stats['unchanged']}"
+                )
+            if self.page_cache:
+                self.stdout.write(
+                    f"Page cache: {self.cache_stats['not_modified']} not modified, "
+                    f"{self.cache_stats['unchanged']} unchanged, {self.cache_stats['parsed']} parsed"
+                )
             
             # Clean up invalid courses after fetching
             self.stdout.write("\nCleaning up invalid course IDs...")
@@ -113,6 +247,126 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR(f"Unexpected error: {str(e)}")
             )
+        finally:
+            self.session.close()
+
+    def http_get(self, url, **kwargs):
+        """GET through the shared session, waiting for the rate limiter first"""
+        self.rate_limiter.acquire()
+        return self.session.get(url, **kwargs)
+
+    def apply_staged_courses(self, staged):
+        """
+        Diff the staged catalog against the live Course rows and apply the
+        inserts, updates and deactivations in one transaction, so readers see
+        either the old or the new catalog. Unchanged rows are not written.
+        """
+        now = timezone.now()
+        to_create, to_update = [], []
+        unchanged = 0
+        
+        with transaction.atomic():
+            live = {course.course_id: course for course in Course.objects.select_for_update()}
+            
+            for course_id, course_data in staged.items():
+                course = live.get(course_id)
+                if course is None:
+                    to_create.append(Course(
+                        course_id=course_id,
+                        is_active=True,
+                        **{field: course_data.get(field) for field in SYNCED_COURSE_FIELDS}
+                    ))
+                    continue
+                
+                changed = not course.is_active
+                course.is_active = True
+                for field in SYNCED_COURSE_FIELDS:
+                    if getattr(course, field) != course_data.get(field):
+                        setattr(course, field, course_data.get(field))
+                        changed = True
+                if changed:
+                    course.last_updated = now
+                    to_update.append(course)
+                else:
+                    unchanged += 1
+            
+            stale_ids = [
+                course.id for course_id, course in live.items()
+                if course_id not in staged and course.is_active
+            ]
+            
+            Course.objects.bulk_create(to_create, batch_size=500)
+            Course.objects.bulk_update(
+                to_update, SYNCED_COURSE_FIELDS + ['is_active', 'last_updated'], batch_size=500
+            )
+            Course.objects.filter(id__in=stale_ids).update(is_active=False, last_updated=now)
+        
+        # Bulk writes send no signals, drop the search index explicitly
+        invalidate_course_index()
+        
+        return {
+            'created': len(to_create),
+            'updated': len(to_update),
+            'deactivated': len(stale_ids),
+            'unchanged': unchanged,
+        }
+
+    def fetch_parsed(self, url, parse, **kwargs):
+        """
+        Return parse(content) for the page at url. With the page cache the
+        request is conditional, and the cached result is reused when the
+        server answers 304 or sends the same content again.
+        """
+        entry = self.page_cache.load(url) if self.page_cache else None
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        response = self.http_get(url, headers=headers, **kwargs)
+        if entry and response.status_code == 304:
+            self.count_cache('not_modified')
+            return entry['parsed']
+        response.raise_for_status()
+        
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if entry and entry.get('content_hash') == content_hash:
+            # The server ignores the validators, but the body is identical
+            self.count_cache('unchanged')
+            parsed = entry['parsed']
+        else:
+            self.count_cache('parsed')
+            parsed = parse(response.content)
+        
+        if self.page_cache:
+            self.page_cache.save(url, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'content_hash': content_hash,
+                'parsed': parsed,
+            })
+        return parsed
+
+    def count_cache(self, outcome):
+        with self.cache_stats_lock:
+            self.cache_stats[outcome] += 1
+
+    def parse_course_list(self, content, base_url):
+        """Course data of every item on the course list page, None if the list is missing"""
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # DEBUG: Save HTML to file for inspection
+        with open('debug_cmu_page.html', 'w', encoding='utf-8') as f:
+            f.write(str(soup.prettify()))
+        self.stdout.write("Saved HTML to debug_cmu_page.html for inspection")
+        
+        # Look for course list items instead of tables
+        course_list = soup.find('ul', id='courseList')
+        if not course_list:
+            return None
+        return [self.extract_course_data(item, base_url) for item in course_list.find_all('li')]
 
     def extract_course_data(self, item, base_url):
         """Extract course data from a course list item"""
@@ -139,40 +393,24 @@ class Command(BaseCommand):
             credits = None
             
             # Look for download and info links
-            syllabus_url = None
             info_url = None
+            download_url = None
             
             # Find info link first (this is the priority)
             info_link = item.find('a', href=True, string=lambda text: text and 'Info' in text)
             if not info_link:
                 # Try finding by URL pattern
                 info_link = item.find('a', href=lambda href: href and '/aolapp/syllabus/course/info/' in href)
-            
             if info_link:
                 info_url = urljoin(base_url, info_link['href'])
-                self.stdout.write(f"Processing {course_id_clean}: Found info URL: {info_url}")
-                # Try to fetch the most recent syllabus URL from the info page with timeout
-                try:
-                    syllabus_url = self.get_syllabus_url_from_info_page(info_url)
-                    if syllabus_url:
-                        self.stdout.write(f"Got syllabus URL from info page: {syllabus_url}")
-                    else:
-                        self.stdout.write(f"No syllabus URL found on info page for {course_id_clean}")
-                except Exception as e:
-                    self.stdout.write(f"Error fetching from info page for {course_id_clean}: {str(e)}")
-                    syllabus_url = None
-            else:
-                self.stdout.write(f"No info link found for {course_id_clean}")
             
-            # Fallback: Find direct download link if info page doesn't work
-            if not syllabus_url:
-                download_link = item.find('a', href=True, string=lambda text: text and 'Download' in text)
-                if not download_link:
-                    # Try finding by icon or class
-                    download_link = item.find('a', href=lambda href: href and '/archive/syllabi/' in href)
-                if download_link:
-                    syllabus_url = urljoin(base_url, download_link['href'])
-                    self.stdout.write(f"Using direct download link: {syllabus_url}")
+            # Direct download link, the fallback if the info page doesn't work
+            download_link = item.find('a', href=True, string=lambda text: text and 'Download' in text)
+            if not download_link:
+                # Try finding by icon or class
+                download_link = item.find('a', href=lambda href: href and '/archive/syllabi/' in href)
+            if download_link:
+                download_url = urljoin(base_url, download_link['href'])
             
             return {
                 'course_id': course_id_clean,
@@ -180,59 +418,51 @@ class Command(BaseCommand):
                 'department': department,
                 'credits': credits,
                 'info_url': info_url,
-                'syllabus_url': syllabus_url,
+                'download_url': download_url,
             }
             
         except Exception as e:
             self.stdout.write(f"Error extracting course data: {str(e)}")
             return None
 
+    def add_syllabus_url(self, course_data):
+        """Resolve the syllabus URL of a parsed course list item (runs on the worker threads)"""
+        if not course_data:
+            return None
+        
+        course_id = course_data['course_id']
+        info_url = course_data['info_url']
+        syllabus_url = None
+        
+        if info_url:
+            self.stdout.write(f"Processing {course_id}: Found info URL: {info_url}")
+            # Try to fetch the most recent syllabus URL from the info page with timeout
+            try:
+                syllabus_url = self.get_syllabus_url_from_info_page(info_url)
+                if syllabus_url:
+                    self.stdout.write(f"Got syllabus URL from info page: {syllabus_url}")
+                else:
+                    self.stdout.write(f"No syllabus URL found on info page for {course_id}")
+            except Exception as e:
+                self.stdout.write(f"Error fetching from info page for {course_id}: {str(e)}")
+                syllabus_url = None
+        else:
+            self.stdout.write(f"No info link found for {course_id}")
+        
+        # Fallback: direct download link if info page doesn't work
+        if not syllabus_url and course_data['download_url']:
+            syllabus_url = course_data['download_url']
+            self.stdout.write(f"Using direct download link: {syllabus_url}")
+        
+        return dict(course_data, syllabus_url=syllabus_url)
+
     def get_syllabus_url_from_info_page(self, info_url):
         """Fetch the most recent syllabus download URL from the course info page"""
         try:
             self.stdout.write(f"Fetching info page: {info_url}")
-            response = requests.get(info_url, timeout=10)  # Reduced timeout
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for download links in order of preference
-            download_candidates = []
-            
-            # Strategy 1: Look for links with /archive/ in href (syllabus files)
-            archive_links = soup.find_all('a', href=lambda href: href and '/archive/' in href)
-            for link in archive_links:
-                href = link.get('href')
-                text = link.get_text(strip=True)
-                if any(ext in href.lower() for ext in ['.pdf', '.docx', '.doc']):
-                    download_candidates.append((href, text, 'archive'))
-            
-            # Strategy 2: Look for "Download" buttons or links
-            download_links = soup.find_all('a', href=True, string=lambda text: text and 'download' in text.lower())
-            for link in download_links:
-                href = link.get('href')
-                text = link.get_text(strip=True)
-                download_candidates.append((href, text, 'download_button'))
-            
-            # Strategy 3: Look for any PDF/DOC links
-            doc_links = soup.find_all('a', href=lambda href: href and any(ext in href.lower() for ext in ['.pdf', '.docx', '.doc']))
-            for link in doc_links:
-                href = link.get('href')
-                text = link.get_text(strip=True)
-                download_candidates.append((href, text, 'doc_link'))
-            
-            if download_candidates:
-                # Sort by strategy preference and pick the first one
-                strategy_priority = {'archive': 1, 'download_button': 2, 'doc_link': 3}
-                download_candidates.sort(key=lambda x: strategy_priority.get(x[2], 999))
-                
-                best_candidate = download_candidates[0]
-                full_url = urljoin(info_url, best_candidate[0])
-                self.stdout.write(f"Found syllabus URL: {full_url} (strategy: {best_candidate[2]})")
-                return full_url
-            
-            self.stdout.write(f"No download links found on info page: {info_url}")
-            return None
+            return self.fetch_parsed(
+                info_url, lambda content: self.parse_info_page(content, info_url), timeout=10  # Reduced timeout
+            )
             
         except requests.Timeout:
             self.stdout.write(f"Timeout fetching info page: {info_url}")
@@ -244,6 +474,48 @@ class Command(BaseCommand):
             self.stdout.write(f"Error parsing info page {info_url}: {str(e)}")
             return None
 
+    def parse_info_page(self, content, info_url):
+        """The most recent syllabus download URL on a course info page"""
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Look for download links in order of preference
+        download_candidates = []
+        
+        # Strategy 1: Look for links with /archive/ in href (syllabus files)
+        archive_links = soup.find_all('a', href=lambda href: href and '/archive/' in href)
+        for link in archive_links:
+            href = link.get('href')
+            text = link.get_text(strip=True)
+            if any(ext in href.lower() for ext in ['.pdf', '.docx', '.doc']):
+                download_candidates.append((href, text, 'archive'))
+        
+        # Strategy 2: Look for "Download" buttons or links
+        download_links = soup.find_all('a', href=True, string=lambda text: text and 'download' in text.lower())
+        for link in download_links:
+            href = link.get('href')
+            text = link.get_text(strip=True)
+            download_candidates.append((href, text, 'download_button'))
+        
+        # Strategy 3: Look for any PDF/DOC links
+        doc_links = soup.find_all('a', href=lambda href: href and any(ext in href.lower() for ext in ['.pdf', '.docx', '.doc']))
+        for link in doc_links:
+            href = link.get('href')
+            text = link.get_text(strip=True)
+            download_candidates.append((href, text, 'doc_link'))
+        
+        if download_candidates:
+            # Sort by strategy preference and pick the first one
+            strategy_priority = {'archive': 1, 'download_button': 2, 'doc_link': 3}
+            download_candidates.sort(key=lambda x: strategy_priority.get(x[2], 999))
+            
+            best_candidate = download_candidates[0]
+            full_url = urljoin(info_url, best_candidate[0])
+            self.stdout.write(f"Found syllabus URL: {full_url} (strategy: {best_candidate[2]})")
+            return full_url
+        
+        self.stdout.write(f"No download links found on info page: {info_url}")
+        return None
+
     def cleanup_invalid_courses(self):
         """Delete courses with invalid course IDs (not having exactly 3 numbers)"""
         try:
@@ -0,0 +1,371 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Prefetch
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+TIERS = ['hourly', 'daily', 'weekly']
+TIER_INTERVALS = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+COMPRESSION_EXTENSIONS = {'gzip': 'gz', 'zstd': 'zst'}
+# Rebuilt by migrate / only transient data, restoring them would clash with the target database
+DEFAULT_EXCLUDE = ['contenttypes', 'auth.permission', 'sessions', 'admin.logentry']
+DUMP_CHUNK_SIZE = 2000
+# Connection alias of the SQLite copy a backup reads from
+SNAPSHOT_ALIAS = 'backup_snapshot'
+
+
+class Command(BaseCommand):
+    help = (
+        'Write an incremental, compressed backup snapshot to BACKUP_DIR and prune old snapshots. '
+        'Each table is dumped as a loaddata-compatible fixture named after the checksum of its contents, '
+        'so unchanged tables are shared between snapshots instead of being written again. All tables are '
+        'read from one consistent state (a copy of the SQLite file, or one REPEATABLE READ transaction). '
+        'Restore a snapshot by running "manage.py loaddata" on the table files listed in its manifest '
+        '(decompress .zst files with "zstd -d" first, loaddata reads .gz directly).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tier',
+            choices=TIERS,
+            help='Retention tier of this snapshot (default: weekly/daily when the last one of that tier is due, else hourly)'
+        )
+        parser.add_argument(
+            '--compression',
+            choices=sorted(COMPRESSION_EXTENSIONS),
+            help='Compression of the table files (default: zstd when the zstandard package is installed, else gzip)'
+        )
+        parser.add_argument(
+            '--exclude',
+            nargs='+',
+            default=DEFAULT_EXCLUDE,
+            help='App labels or app.Model names to leave out (default: %s)' % ' '.join(DEFAULT_EXCLUDE)
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Write a snapshot even when nothing changed since the last one'
+        )
+        parser.add_argument(
+            '--every',
+            type=int,
+            metavar='MINUTES',
+            help='Keep running and take a snapshot every MINUTES minutes (simple built-in scheduler)'
+        )
+        for tier in TIERS:
+            parser.add_argument(
+                '--keep-%s' % tier,
+                type=int,
+                help='Number of %s snapshots to keep (default: BACKUP_RETENTION)' % tier
+            )
+
+    def handle(self, *args, **options):
+        compression = options.get('compression') or ('zstd' if zstandard else 'gzip')
+        if compression == 'zstd' and zstandard is None:
+            raise CommandError('zstd compression needs the "zstandard" package, install it or use --compression gzip')
+        options['compression'] = compression
+
+        self.backup_dir = str(settings.BACKUP_DIR)
+        self.tables_dir = os.path.join(self.backup_dir, 'tables')
+        self.snapshots_dir = os.path.join(self.backup_dir, 'snapshots')
+        self.state_path = os.path.join(self.backup_dir, 'state.json')
+        os.makedirs(self.tables_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+        retention = dict(getattr(settings, 'BACKUP_RETENTION', {}))
+        for tier in TIERS:
+            if options.get('keep_%s' % tier) is not None:
+                retention[tier] = options['keep_%s' % tier]
+        self.retention = retention
+
+        every = options.get('every')
+        if not every:
+            self.run_backup(options)
+            return
+
+        self.stdout.write(f'Taking a backup every {every} minute(s), press Ctrl+C to stop')
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    self.run_backup(options)
+                except Exception as e:
+                    # Keep the scheduler alive, the next run may well succeed
+                    self.stderr.write(f'Backup failed: {e}')
+                connection.close()
+                time.sleep(max(0, every * 60 - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            self.stdout.write('Scheduler stopped')
+
+    def run_backup(self, options):
+        now = datetime.now()
+        manifests = self.load_manifests()
+        latest = manifests[-1] if manifests else None
+        tier = options.get('tier') or self.pick_tier(manifests, now)
+        compression = options['compression']
+        force = options.get('force')
+        state = self.load_state()
+
+        with self.snapshot_database() as (alias, sqlite_copy):
+            page_hashes = self.sqlite_page_hashes(sqlite_copy) if sqlite_copy else None
+            if page_hashes is not None:
+                previous = state.get('sqlite_pages') or []
+                changed_pages = sum(
+                    1 for index, digest in enumerate(page_hashes)
+                    if index >= len(previous) or previous[index] != digest
+                )
+                self.stdout.write(f'SQLite: {changed_pages} of {len(page_hashes)} pages changed since the last backup')
+
+            if (
+                latest and page_hashes is not None and page_hashes == state.get('sqlite_pages')
+                and latest.get('compression') == compression and latest.get('exclude') == sorted(options['exclude'])
+            ):
+                # Not a single page changed, the latest snapshot's table files are still exact
+                tables, checksums, written = dict(latest['tables']), dict(latest['checksums']), []
+            else:
+                tables, checksums, written = self.dump_tables(options['exclude'], compression, alias)
+
+        unchanged = latest is not None and checksums == latest.get('checksums')
+        if unchanged and tier == 'hourly' and not force:
+            self.stdout.write(self.style.SUCCESS('No changes since the last backup, nothing to do'))
+        else:
+            manifest = {
+                'created': now.isoformat(timespec='seconds'),
+                'tier': tier,
+                'database': connection.vendor,
+                'compression': compression,
+                'exclude': sorted(options['exclude']),
+                'tables': tables,
+                'checksums': checksums,
+            }
+            manifest_path = os.path.join(self.snapshots_dir, f'{tier}-{now:%Y%m%d-%H%M%S}.json')
+            self.write_json(manifest_path, manifest)
+            self.stdout.write(self.style.SUCCESS(
+                f'Wrote {tier} snapshot {os.path.basename(manifest_path)}: '
+                f'{len(written)} of {len(tables)} tables changed'
+            ))
+            for label in written:
+                self.stdout.write(f'  {label} -> {tables[label]}')
+
+        if page_hashes is not None:
+            state['sqlite_pages'] = page_hashes
+            self.write_json(self.state_path, state)
+
+        self.prune()
+
+    def pick_tier(self, manifests, now):
+        """
+        The longest tier whose interval has passed since its last snapshot. A
+        snapshot of a longer tier also counts for the shorter ones.
+        """
+        for position in range(len(TIERS) - 1, 0, -1):
+            tier = TIERS[position]
+            last = None
+            for manifest in manifests:
+                if manifest['tier'] in TIERS[position:]:
+                    last = datetime.fromisoformat(manifest['created'])
+            if last is None or now - last >= TIER_INTERVALS[tier]:
+                return tier
+        return 'hourly'
+
+    def backup_models(self, exclude):
+        """Concrete models to back up, in dependency order so loaddata can replay them"""
+        excluded_apps = {label for label in exclude if '.' not in label}
+        excluded_models = {label.lower() for label in exclude if '.' in label}
+        app_list = [
+            (app_config, None) for app_config in apps.get_app_configs()
+            if app_config.label not in excluded_apps and app_config.models_module is not None
+        ]
+        models = []
+        for model in serializers.sort_dependencies(app_list, allow_cycles=True):
+            if model._meta.proxy or not model._meta.managed:
+                continue
+            if model._meta.label_lower in excluded_models:
+                continue
+            models.append(model)
+        return models
+
+    @contextmanager
+    def snapshot_database(self):
+        """
+        Yield (alias, sqlite_copy): a connection alias that sees the database
+        as of one moment for the whole backup. On SQLite that is a copy made
+        with the backup API (sqlite_copy is its path), elsewhere the default
+        connection inside one read-only transaction, REPEATABLE READ on
+        PostgreSQL (sqlite_copy is None).
+        """
+        if connection.vendor != 'sqlite':
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+                yield DEFAULT_DB_ALIAS, None
+            return
+
+        db_path = str(settings.DATABASES['default']['NAME'])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            snapshot_path = os.path.join(temp_dir, 'snapshot.sqlite3')
+            source = sqlite3.connect(db_path)
+            target = sqlite3.connect(snapshot_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+
+            connections.databases[SNAPSHOT_ALIAS] = {**connections.databases[DEFAULT_DB_ALIAS], 'NAME': snapshot_path}
+            try:
+                yield SNAPSHOT_ALIAS, snapshot_path
+            finally:
+                connections[SNAPSHOT_ALIAS].close()
+                del connections[SNAPSHOT_ALIAS]
+                del connections.databases[SNAPSHOT_ALIAS]
+
+    def dump_tables(self, exclude, compression, alias):
+        """Dump every table from alias, writing the ones without a table file yet"""
+        tables, checksums, written = {}, {}, []
+        for model in self.backup_models(exclude):
+            label = model._meta.label
+            filename, checksum, is_new = self.dump_table(model, alias, compression)
+            if is_new:
+                written.append(label)
+            tables[label] = filename
+            checksums[label] = checksum
+        return tables, checksums, written
+
+    def dump_table(self, model, alias, compression):
+        """
+        Serialize a table (with its auto-created many-to-many tables) and name
+        the file after the sha256 of the JSON written, so the name always
+        matches the contents. The compressed file is only written when no
+        file of that name exists yet. Returns (filename, checksum, is_new).
+        """
+        queryset = model._base_manager.using(alias).order_by('pk')
+        m2m_prefetches = [
+            # Ordered so unchanged relations serialize to the same bytes
+            Prefetch(field.name, queryset=field.related_model._base_manager.order_by('pk'))
+            for field in model._meta.local_many_to_many
+            if field.remote_field.through._meta.auto_created
+        ]
+        if m2m_prefetches:
+            # The serializer reuses prefetched relations instead of querying each row
+            queryset = queryset.prefetch_related(*m2m_prefetches)
+
+        with tempfile.TemporaryDirectory(dir=self.tables_dir) as temp_dir:
+            json_path = os.path.join(temp_dir, 'table.json')
+            with open(json_path, 'w', encoding='utf-8') as stream:
+                serializers.serialize('json', queryset.iterator(chunk_size=DUMP_CHUNK_SIZE), stream=stream)
+
+            digest = hashlib.sha256()
+            with open(json_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            checksum = digest.hexdigest()
+
+            filename = f'{model._meta.label_lower}-{checksum[:16]}.json.{COMPRESSION_EXTENSIONS[compression]}'
+            path = os.path.join(self.tables_dir, filename)
+            if os.path.exists(path):
+                return filename, checksum, False
+
+            temp_path = os.path.join(temp_dir, filename)
+            with open(json_path, 'rb') as source, self.open_compressed(temp_path, compression) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            os.replace(temp_path, path)
+        return filename, checksum, True
+
+    def open_compressed(self, path, compression):
+        if compression == 'zstd':
+            return zstandard.ZstdCompressor(level=10).stream_writer(open(path, 'wb'))
+        return gzip.open(path, 'wb')
+
+    def sqlite_page_hashes(self, snapshot_path):
+        """
+        Hash every page of the SQLite copy. Identical hashes mean no table
+        can have changed.
+        """
+        snapshot_db = sqlite3.connect(snapshot_path)
+        try:
+            page_size = snapshot_db.execute('PRAGMA page_size').fetchone()[0]
+        finally:
+            snapshot_db.close()
+
+        page_hashes = []
+        with open(snapshot_path, 'rb') as snapshot:
+            for page in iter(lambda: snapshot.read(page_size), b''):
+                page_hashes.append(hashlib.blake2b(page, digest_size=8).hexdigest())
+        return page_hashes
+
+    def load_manifests(self):
+        """All snapshot manifests, oldest first"""
+        manifests = []
+        for filename in os.listdir(self.snapshots_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.snapshots_dir, filename)) as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                self.stderr.write(f'Ignoring unreadable manifest {filename}: {e}')
+                continue
+            manifest['filename'] = filename
+            manifests.append(manifest)
+        manifests.sort(key=lambda manifest: manifest['created'])
+        return manifests
+
+    def load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_json(self, path, data):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(temp_path, path)
+
+    def prune(self):
+        """Keep the newest snapshots of each tier and delete table files no snapshot uses"""
+        manifests = self.load_manifests()
+        kept = []
+        for tier in TIERS:
+            tier_manifests = [manifest for manifest in manifests if manifest['tier'] == tier]
+            keep = max(0, self.retention.get(tier, len(tier_manifests)))
+            expired = tier_manifests[:len(tier_manifests) - keep] if keep else tier_manifests
+            for manifest in expired:
+                os.remove(os.path.join(self.snapshots_dir, manifest['filename']))
+                self.stdout.write(f'Pruned {tier} snapshot {manifest["filename"]}')
+            kept.extend(manifest for manifest in tier_manifests if manifest not in expired)
+
+        referenced = {filename for manifest in kept for filename in manifest['tables'].values()}
+        removed = 0
+        for filename in os.listdir(self.tables_dir):
+            path = os.path.join(self.tables_dir, filename)
+            if filename not in referenced and os.path.isfile(path) and not filename.endswith('.tmp'):
+                os.remove(path)
+                removed += 1
+        if removed:
+            self.stdout.write(f'Removed {removed} unreferenced table file(s)')
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:08
+
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+def backfill_rankings(apps, schema_editor):
+    """Rank the students of every existing dean's list (same order as update_dean_list_rankings)."""
+    DeanList = apps.get_model('main', 'DeanList')
+    DeanListStudent = apps.get_model('main', 'DeanListStudent')
+
+    ordering = [F('gpa').desc(), F('student_name').asc(), F('id').asc()]
+    for dean_list_id in DeanList.objects.values_list('id', flat=True):
+        students = list(DeanListStudent.objects.filter(dean_list_id=dean_list_id).annotate(
+            computed_overall_rank=Window(RowNumber(), order_by=ordering),
+            computed_major_rank=Window(RowNumber(), partition_by=[F('student_major')], order_by=ordering),
+        ).only('id'))
+        for student in students:
+            student.overall_rank = student.computed_overall_rank
+            student.major_rank = student.computed_major_rank
+        DeanListStudent.objects.bulk_update(students, ['overall_rank', 'major_rank'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0034_readinggroupapplication'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deanliststudent',
+            name='major_rank',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deanliststudent',
+            name='overall_rank',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_rankings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+# Supports DeanListStudent.objects.filter(student_name__icontains=...), which
+# PostgreSQL runs as UPPER(student_name) LIKE UPPER(%s)
+STUDENT_NAME_TRIGRAM_INDEX = 'deanlist_student_name_trgm_idx'
+
+
+def create_student_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        available = cursor.fetchone() is not None
+    if not available:
+        # Name search still works without it, as a sequential scan
+        print(f"\n  pg_trgm is not available on this PostgreSQL server, skipping index {STUDENT_NAME_TRIGRAM_INDEX}")
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {STUDENT_NAME_TRIGRAM_INDEX} '
+        'ON main_deanliststudent USING gin (UPPER(student_name) gin_trgm_ops)'
+    )
+
+
+def drop_student_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {STUDENT_NAME_TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0035_deanliststudent_rankings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deanliststudent',
+            index=models.Index(fields=['year', 'semester', 'student_major', '-gpa'], name='deanlist_term_major_gpa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deanliststudent',
+            index=models.Index(fields=['student_id', 'year', 'semester'], name='deanlist_student_term_idx'),
+        ),
+        migrations.RunPython(create_student_name_trigram_index, drop_student_name_trigram_index),
+    ]
@@ -199,6 +199,21 @@ class DeanListStudent(models.Model):
     passed_credits = models.IntegerField()
     registered_credits = models.IntegerField()
     dean_list = models.ForeignKey(DeanList, on_delete=models.CASCADE, related_name='students')
+    # Position within the dean's list and within the major, ordered by GPA (highest first)
+    # then name. Filled in by main.utils.update_dean_list_rankings after each import.
+    overall_rank = models.PositiveIntegerField(null=True, blank=True)
+    major_rank = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Dean's list pages: one semester, grouped by major, best GPA first
+            models.Index(fields=['year', 'semester', 'student_major', '-gpa'], name='deanlist_term_major_gpa_idx'),
+            # Student search and parking eligibility: one student across semesters
+            models.Index(fields=['student_id', 'year', 'semester'], name='deanlist_student_term_idx'),
+        ]
+        # A trigram index for student_name__icontains is created on PostgreSQL
+        # only, by migration 0036
+
     def __str__(self):
         return f"{self.student_name} - {self.semester} {self.year}"
 
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .context_processors import invalidate_user_stats
+from .course_search import invalidate_course_index
+from .utils import invalidate_merged_dean_list
+from .models import User, DeanList, Application, Course
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=DeanList)
+@receiver(post_delete, sender=DeanList)
+def user_stats_changed(sender, **kwargs):
+    """
+    Invalidate the cached portal counters when a counted model changes.
+
+    DeanListStudent has no receiver so its deletes stay fast deletes, the
+    code writing student rows invalidates explicitly.
+    """
+    invalidate_user_stats()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, update_fields=None, **kwargs):
+    """Invalidate the portal counters unless only last_login changed (every login saves it)"""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidate_user_stats()
+
+
+@receiver(post_save, sender=DeanList)
+@receiver(post_delete, sender=DeanList)
+def merged_dean_list_changed(sender, instance, **kwargs):
+    """Invalidate the cached merged Fall/Spring list of the changed year"""
+    invalidate_merged_dean_list(instance.year)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_catalog_changed(sender, **kwargs):
+    """Rebuild the course search index on the next search"""
+    invalidate_course_index()
@@ -1,5 +1,7 @@
 from django import template
-from urllib.parse import urlparse, parse_qs, quote as urlquote
+from urllib.parse import urlparse, parse_qs, quote as urlquote, unquote
+
+from main.image_cache import PROXY_ALLOWED_HOSTS
 
 register = template.Library()
 
@@ -26,19 +28,19 @@ def normalize_image_url(value):
                 try:
                     d_index = parts.index('d')
                     file_id = parts[d_index+1]
-                    return f"/image-proxy/?url=https://drive.google.com/uc?export=view&id={file_id}"
+                    return f"/image-proxy/?url={urlquote(f'https://drive.google.com/uc?export=view&id={file_id}')}"
                 except Exception:
                     pass
             # ?id= pattern
             qs = parse_qs(parsed.query)
             if 'id' in qs:
                 file_id = qs['id'][0]
-                return f"/image-proxy/?url=https://drive.google.com/uc?export=view&id={file_id}"
+                return f"/image-proxy/?url={urlquote(f'https://drive.google.com/uc?export=view&id={file_id}')}"
             # fallback: use uc?export=view with the 'id' portion if the path contains /d/
             if '/d/' in path:
                 try:
                     file_id = path.split('/d/')[1].split('/')[0]
-                    return f"/image-proxy/?url=https://drive.google.com/uc?export=view&id={file_id}"
+                    return f"/image-proxy/?url={urlquote(f'https://drive.google.com/uc?export=view&id={file_id}')}"
                 except Exception:
                     pass
 
@@ -50,3 +52,49 @@ def normalize_image_url(value):
         return value
     except Exception:
         return value
+
+
+def _proxy_source_url(value):
+    """The upstream URL image_proxy would fetch for value, None if it can't be proxied"""
+    normalized = normalize_image_url(value)
+    if not normalized:
+        return None
+    if normalized.startswith('/image-proxy/?url='):
+        return unquote(normalized[len('/image-proxy/?url='):])
+    if urlparse(normalized).netloc.lower() in PROXY_ALLOWED_HOSTS:
+        return normalized
+    return None
+
+
+@register.filter
+def image_thumbnail_url(value, width=640):
+    """Proxy URL of a resized WebP version of an image link.
+
+    Usage: {{ event.image_url|image_thumbnail_url:640 }}
+    Links the proxy can't fetch are returned as normalize_image_url would.
+    """
+    source = _proxy_source_url(value)
+    if not source:
+        return normalize_image_url(value)
+    try:
+        width = int(width)
+    except (TypeError, ValueError):
+        width = 640
+    return f"/image-proxy/?url={urlquote(source)}&w={width}&fmt=webp"
+
+
+@register.filter
+def image_srcset(value, widths='320,640,960'):
+    """srcset value with WebP thumbnails of an image link at the given widths.
+
+    Usage: <img srcset="{{ event.image_url|image_srcset:'320,640,960' }}" sizes="...">
+    Returns an empty string for links the proxy can't fetch.
+    """
+    if not _proxy_source_url(value):
+        return ''
+    candidates = []
+    for width in str(widths).split(','):
+        width = width.strip()
+        if width.isdigit():
+            candidates.append(f"{image_thumbnail_url(value, width)} {width}w")
+    return ', '.join(candidates)
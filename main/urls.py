@@ -6,6 +6,7 @@ urlpatterns = [
     path('resources/', views.resources, name='resources'),
     path('resources/student-guide/', views.student_guide, name='student_guide'),
     path('resources/course-descriptions/', views.course_descriptions, name='course_descriptions'),
+    path('resources/course-descriptions/autocomplete/', views.course_autocomplete, name='course_autocomplete'),
     path('apply', views.apply, name='apply'),
     path('reading-group', views.reading_group_application, name='reading_group'),
     path('parking', views.parking_application, name='parking_application'),
@@ -33,6 +34,7 @@ urlpatterns = [
     path("login", views.login_view, name="login"),
     path("logout", views.logout_view, name="logout"),
     path('portal/newdl', views.newdl, name='newdl'),
+    path('portal/newdl/status/<str:job_id>/', views.newdl_status, name='newdl_status'),
     path('portal/student-search', views.student_search, name='student_search'),
     path('portal/applications', views.application_management, name='application_management'),
     path('portal/applications/delete/<int:application_id>/', views.delete_application, name='delete_application'),
@@ -62,6 +64,7 @@ urlpatterns = [
     path('portal/events/<int:pk>/export-sections/', views.export_event_sections, name='export_event_sections'),
     path('portal/database/backup/', views.backup_database, name='backup_database'),
     path('portal/database/restore/', views.restore_database, name='restore_database'),
+    path('portal/database/restore/status/<str:job_id>/', views.restore_database_status, name='restore_database_status'),
     path('portal/merged-deans-list/', views.merged_deans_list, name='merged_deans_list'),
     # Test route for 404 page
     path('test-404/', views.custom_404_view, name='test_404'),
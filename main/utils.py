@@ -1,74 +1,20 @@
+import logging
 import pandas as pd
 import re
+from decimal import Decimal
+from itertools import chain, islice
 
 from main.models import DeanList
 
-def process_dean_list_excel(excel_file, semester, year):
-    try:
-        print("=== STARTING process_dean_list_excel ===")
-        # Read the Excel file once with no header to examine all rows
-        original_df = pd.read_excel(excel_file, engine='openpyxl', header=None)
-        print(f"Excel file read successfully. Shape: {original_df.shape}")
-        
-        # Find the header row
-        header_row_index = find_header_row(original_df)
-        print(f"find_header_row returned: {header_row_index}")
-        
-        if header_row_index is None:
-            raise ValueError("Could not find a valid header row in the Excel file")
-        
-        # Extract the header row content
-        header_row = original_df.iloc[header_row_index]
-        print(f"Header row content: {header_row.tolist()}")
-        
-        # Create a new DataFrame with the data starting after the header row
-        data_rows = original_df.iloc[header_row_index + 1:]  # Skip header row
-        
-        # Set the column names from the header row
-        column_names = []
-        for i, val in enumerate(header_row):
-            if pd.isna(val) or str(val).strip() == '':
-                column_names.append(f'Unnamed_{i}')
-            else:
-                column_names.append(str(val).strip())
-        
-        data_rows.columns = column_names
-        
-        # Reset the index
-        df = data_rows.reset_index(drop=True)
-        
-        print(f"Final DataFrame shape: {df.shape}")
-        print(f"Final columns: {list(df.columns)}")
-        
-        # Store the data in the database
-        print("About to store data in database...")
-        students_saved = store_excel_data_in_database(df, semester, year)
-        print(f"Database storage completed. {students_saved} students saved.")
-        cleanup_invalid_dean_list_records()
-        # Return the DataFrame and summary info
-        return df, header_row_index, students_saved
+logger = logging.getLogger(__name__)
 
-    except Exception as e:
-        print(f"ERROR in process_dean_list_excel: {str(e)}")
-        raise ValueError(f"Error processing Excel file: {str(e)}")
-
-
-def store_excel_data_in_database(df, semester, year):
-    """
-    Store the processed Excel data in the database.
-    Returns the number of students successfully saved.
-    """
-    from .models import DeanListStudent
-    
-    print("=== STORING DATA IN DATABASE ===")
-    print(f"DataFrame shape: {df.shape}")
-    print(f"DataFrame columns: {list(df.columns)}")
-    print(f"Semester: {semester}, Year: {year}")
 
-    # Define possible column names for each field with various Arabic spelling variations
-    passed_credits_names = [
+# Possible column headers for each DeanListStudent field, with various Arabic
+# spelling variations, in order of preference
+DEAN_LIST_COLUMN_NAMES = {
+    'passed_credits': [
         'الوحدات الكلية المجتازة',
-        'الوحدات المجتازة', 
+        'الوحدات المجتازة',
         'الوحدات المجتازه',
         'الوحدات الكليه المجتازه',
         'الوحدات الكليه المجتازة',
@@ -76,10 +22,9 @@ def store_excel_data_in_database(df, semester, year):
         'الوحدات المكتسبة',
         'الوحدات المكتسبه',
         'الوحدات المنجزة',
-        'الوحدات المنجزه'
-    ]
-    
-    student_name_names = [
+        'الوحدات المنجزه',
+    ],
+    'student_name': [
         'اسم الطالب',
         'اسم الطالبة',
         'اسم الطالب/ة',
@@ -88,10 +33,9 @@ def store_excel_data_in_database(df, semester, year):
         'أسم الطالب',
         'إسم الطالب',
         'Student Name',
-        'Name'
-    ]
-    
-    student_id_names = [
+        'Name',
+    ],
+    'student_id': [
         'رقم الطالب',
         'رقم الطالبة',
         'رقم الطالب/ة',
@@ -100,187 +44,427 @@ def store_excel_data_in_database(df, semester, year):
         'رقم الهوية',
         'رقم الهويه',
         'Student ID',
-        'ID'
-    ]
-    
-    gpa_names = [
+        'ID',
+    ],
+    'gpa': [
         'المعدل العام',
         'المعدل',
         'المعدل التراكمي',
         'المعدل التراكمى',
         'GPA',
-        'Grade Point Average'
+        'Grade Point Average',
+    ],
+    'student_major': [
+        'التخصص',
+        'التخصص الدراسي',
+        'Major',
+    ],
+    'registered_credits': [
+        'الوحدات المسجلة',
+        'الوحدات المسجله',
+        'Registered Credits',
+    ],
+}
+
+# Minimum number of filled cells for a row to be considered a header
+HEADER_MIN_FILLED_CELLS = 3
+
+# A text cell counts as a number when more than this share of it is digits
+HEADER_MAX_DIGIT_RATIO = 0.7
+
+# Number of DeanListStudent rows written per INSERT statement, and rows
+# held in memory per chunk when streaming a workbook
+DEAN_LIST_BATCH_SIZE = 500
+
+# Rows read at a time while looking for the header in a streamed workbook
+HEADER_SCAN_BLOCK_SIZE = 50
+
+# Cell values that pandas/Excel produce for blank cells once stringified
+INVALID_TEXT_VALUES = ['', 'nan', 'none', 'null']
+
+
+def _text_column(df, column_name):
+    """
+    Return a column as stripped strings, with blank/NaN/"none"/"null" cells as ''.
+    Float columns (numeric columns containing blanks) are rendered without a
+    trailing '.0' so student IDs keep their original form.
+    """
+    if not column_name:
+        return pd.Series('', index=df.index, dtype=object)
+
+    values = df[column_name]
+    text = values.astype(str)
+    if pd.api.types.is_float_dtype(values):
+        integral = values % 1 == 0
+        text = text.where(~integral, values.where(integral).astype('Int64').astype(str))
+    text = text.astype(object).where(values.notna(), '').str.strip()
+    return text.mask(text.str.lower().isin(INVALID_TEXT_VALUES), '')
+
+
+def _numeric_column(df, column_name):
+    """
+    Return a column coerced to floats, with missing or non-numeric cells as NaN.
+    """
+    if not column_name:
+        return pd.Series(float('nan'), index=df.index)
+    values = pd.to_numeric(df[column_name], errors='coerce')
+    return values.where(values.abs() != float('inf'))
+
+
+def _get_dean_list(semester, year):
+    """
+    Return the DeanList that uploaded rows are attached to.
+    """
+    try:
+        return DeanList.objects.get(semester=semester, year=year)
+    except DeanList.DoesNotExist:
+        raise ValueError(f"No Dean's List exists for {semester} {year}")
+
+
+def build_dean_list_students(df, columns, dean_list):
+    """
+    Turn spreadsheet rows into unsaved DeanListStudent objects.
+
+    df holds the data rows indexed by spreadsheet row number and columns is
+    the field mapping returned by resolve_dean_list_columns. Columns are
+    coerced in bulk with pandas rather than row by row.
+
+    Returns a tuple (students, rejected_rows) where rejected_rows is a list
+    of dictionaries describing every row that cannot be stored.
+    """
+    from .models import DeanListStudent
+
+    # Fully blank rows are padding, not rejections
+    df = df.dropna(how='all')
+
+    # Coerce every column in one pass
+    student_names = _text_column(df, columns['student_name'])
+    student_ids = _text_column(df, columns['student_id'])
+    student_majors = _text_column(df, columns['student_major'])
+    gpas = _numeric_column(df, columns['gpa']).fillna(0.0).round(2)
+    passed_credits = _numeric_column(df, columns['passed_credits']).fillna(0).astype('int64')
+    registered_credits = _numeric_column(df, columns['registered_credits']).fillna(0).astype('int64')
+
+    # Flag rows that cannot be stored; the first matching reason wins
+    name_field = DeanListStudent._meta.get_field('student_name')
+    id_field = DeanListStudent._meta.get_field('student_id')
+    major_field = DeanListStudent._meta.get_field('student_major')
+    checks = [
+        (student_names == '', 'empty student_name'),
+        (student_ids == '', 'empty student_id'),
+        (student_names.str.len() > name_field.max_length, f'student_name longer than {name_field.max_length} characters'),
+        (student_ids.str.len() > id_field.max_length, f'student_id longer than {id_field.max_length} characters'),
+        (student_majors.str.len() > major_field.max_length, f'student_major longer than {major_field.max_length} characters'),
+        ((gpas < 0) | (gpas >= 10), 'GPA out of range'),
     ]
-    
-    major_names = [
-        'التخصص', 
-        'التخصص الدراسي', 
-        'Major'
+    reasons = pd.Series('', index=df.index, dtype=object)
+    for mask, reason in reversed(checks):
+        reasons = reasons.mask(mask, reason)
+    rejected = reasons != ''
+
+    rejected_rows = [
+        {
+            'row': index,
+            'student_name': student_names[index],
+            'student_id': student_ids[index],
+            'reason': reasons[index],
+        }
+        for index in df.index[rejected]
     ]
-    
-    registered_credits_names = [
-        'الوحدات المسجلة', 
-        'الوحدات المسجله', 
-        'Registered Credits'
+
+    valid = ~rejected
+    students = [
+        DeanListStudent(
+            student_name=name,
+            student_id=student_id,
+            student_major=major,
+            semester=dean_list.semester,
+            year=dean_list.year,
+            gpa=Decimal(f'{gpa:.2f}'),
+            passed_credits=passed,
+            registered_credits=registered,
+            dean_list=dean_list,
+        )
+        for name, student_id, major, gpa, passed, registered in zip(
+            student_names[valid].tolist(),
+            student_ids[valid].tolist(),
+            student_majors[valid].tolist(),
+            gpas[valid].tolist(),
+            passed_credits[valid].tolist(),
+            registered_credits[valid].tolist(),
+        )
     ]
-    
-    # Find actual column names
-    passed_credits_column = find_column_by_names(df, passed_credits_names)
-    student_name_column = find_column_by_names(df, student_name_names)
-    student_id_column = find_column_by_names(df, student_id_names)
-    gpa_column = find_column_by_names(df, gpa_names)
-    major_column = find_column_by_names(df, major_names)
-    registered_credits_column = find_column_by_names(df, registered_credits_names)
-    
-    print(f"Found columns:")
-    print(f"  Student name: {student_name_column}")
-    print(f"  Student ID: {student_id_column}")
-    print(f"  GPA: {gpa_column}")
-    print(f"  Passed credits: {passed_credits_column}")
-    print(f"  Major: {major_column}")
-    print(f"  Registered credits: {registered_credits_column}")
-    
-    # Show normalized versions for debugging
-    if student_name_column:
-        print(f"  Student name normalized: '{normalize_arabic_text(student_name_column)}'")
-    if passed_credits_column:
-        print(f"  Passed credits normalized: '{normalize_arabic_text(passed_credits_column)}'")
-    
-    # Check if we found the essential columns
-    if not student_name_column or not student_id_column:
-        print("ERROR: Could not find essential columns (student name or ID)")
-        print("Available columns:", list(df.columns))
-        return 0
-    
-    saved_count = 0
-    error_count = 0
-    
-    print(f"\nProcessing {len(df)} rows...")
-    
-    for index, row in df.iterrows():
-        try:
-            # Debug print for first few rows
-            if index < 3:
-                print(f"\nRow {index} data:")
-                for col in df.columns:
-                    print(f"  {col}: {row[col]}")
-            
-            # Get values with fallbacks
-            student_name = row.get(student_name_column, '') if student_name_column else ''
-            student_id = row.get(student_id_column, '') if student_id_column else ''
-            gpa_value = row.get(gpa_column, 0.0) if gpa_column else 0.0
-            
-            # Handle passed_credits
-            passed_credits_value = 0
-            if passed_credits_column:
-                passed_credits_value = row.get(passed_credits_column, 0)
-                if pd.isna(passed_credits_value):
-                    passed_credits_value = 0
-            
-            # Convert values to appropriate types
-            try:
-                gpa_value = float(gpa_value) if not pd.isna(gpa_value) else 0.0
-                passed_credits_value = int(passed_credits_value) if not pd.isna(passed_credits_value) else 0
-            except (ValueError, TypeError):
-                print(f"Warning: Could not convert numeric values for student {student_id}")
-                gpa_value = 0.0
-                passed_credits_value = 0
-            
-            # Skip empty rows
-            if not student_name or not student_id:
-                print(f"Skipping empty row {index}")
-                continue
-            
-            # Create and save the student record
-            student = DeanListStudent(
-                student_name=str(student_name),
-                student_id=str(student_id),
-                student_major=row.get(major_column, '') if major_column else '',
-                semester=semester,
-                year=year,
-                gpa=gpa_value,
-                passed_credits=passed_credits_value,
-                registered_credits=get_numeric_value(row, registered_credits_column),
-                dean_list=DeanList.objects.get(semester=semester, year=year)  # Link to the DeanList instance
-            )
-            student.save()
-            saved_count += 1
-            
-            if index < 3:
-                print(f"Successfully saved student: {student_name} (ID: {student_id})")
-                
-        except Exception as e:
-            error_count += 1
-            print(f"Error saving student at row {index}: {str(e)}")
-            print(f"  Student data: Name='{student_name}', ID='{student_id}'")
-            continue
-    
-    print(f"\n=== DATABASE STORAGE SUMMARY ===")
-    print(f"Total rows processed: {len(df)}")
-    print(f"Successfully saved: {saved_count}")
-    print(f"Errors: {error_count}")
-    print("=== END DATABASE STORAGE ===\n")
-    
-    return saved_count
+    return students, rejected_rows
+
+
+def _has_essential_columns(columns):
+    """
+    Check that the student name and ID columns were both found.
+    """
+    return bool(columns['student_name'] and columns['student_id'])
+
+
+def update_dean_list_rankings(dean_list):
+    """
+    Store each student's overall and per-major position in a dean's list.
+
+    Positions are computed in the database with ROW_NUMBER() window functions
+    ordered by GPA (highest first) then name, and only rows whose position
+    changed are written back. Returns the number of rows updated.
+    """
+    from django.db import transaction
+    from django.db.models import F, Window
+    from django.db.models.functions import RowNumber
+    from .models import DeanListStudent
+
+    ordering = [F('gpa').desc(), F('student_name').asc(), F('id').asc()]
+    ranked = DeanListStudent.objects.filter(dean_list=dean_list).annotate(
+        computed_overall_rank=Window(RowNumber(), order_by=ordering),
+        computed_major_rank=Window(RowNumber(), partition_by=[F('student_major')], order_by=ordering),
+    ).only('id', 'overall_rank', 'major_rank')
+
+    changed = []
+    for student in ranked:
+        if (student.overall_rank, student.major_rank) != (student.computed_overall_rank, student.computed_major_rank):
+            student.overall_rank = student.computed_overall_rank
+            student.major_rank = student.computed_major_rank
+            changed.append(student)
+
+    with transaction.atomic():
+        DeanListStudent.objects.bulk_update(changed, ['overall_rank', 'major_rank'], batch_size=DEAN_LIST_BATCH_SIZE)
+    return len(changed)
+
+
+def _header_column_names(header_values):
+    """
+    Build DataFrame column names from the header row, naming blank cells Unnamed_<i>.
+    """
+    column_names = []
+    for i, val in enumerate(header_values):
+        if val is None or pd.isna(val) or str(val).strip() == '':
+            column_names.append(f'Unnamed_{i}')
+        else:
+            column_names.append(str(val).strip())
+    return column_names
+
+
+def _convert_cell(value):
+    """
+    Convert an openpyxl cell value the way pandas.read_excel does (integral floats become ints).
+    """
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _rows_to_frame(rows, column_names=None):
+    """
+    Build a DataFrame from (row_number, values) pairs, indexed by row number.
+    Rows are padded or truncated to the header width when column_names is given.
+    """
+    index = [number for number, _ in rows]
+    if column_names is None:
+        data = [[_convert_cell(value) for value in values] for _, values in rows]
+        return pd.DataFrame(data, index=index)
+
+    width = len(column_names)
+    data = [
+        [_convert_cell(value) for value in values[:width]] + [None] * (width - len(values))
+        for _, values in rows
+    ]
+    return pd.DataFrame(data, index=index, columns=column_names)
+
+
+def _find_streamed_header(rows, debug=False):
+    """
+    Consume rows until the header row is found, scanning HEADER_SCAN_BLOCK_SIZE
+    rows at a time with find_header_row.
+
+    Returns (header_row_number, header_values, remaining_rows) where
+    remaining_rows are the already-read rows that follow the header, or
+    (None, None, []) when the sheet has no header.
+    """
+    while True:
+        block = list(islice(rows, HEADER_SCAN_BLOCK_SIZE))
+        if not block:
+            return None, None, []
+
+        header_row_number = find_header_row(_rows_to_frame(block), debug=debug)
+        if header_row_number is not None:
+            header_values = next(values for number, values in block if number == header_row_number)
+            remaining_rows = [(number, values) for number, values in block if number > header_row_number]
+            return header_row_number, header_values, remaining_rows
+
+
+def iter_dean_list_chunks(rows, column_names, chunk_size=DEAN_LIST_BATCH_SIZE):
+    """
+    Group (row_number, values) pairs into DataFrames of at most chunk_size rows.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield _rows_to_frame(chunk, column_names)
+            chunk = []
+    if chunk:
+        yield _rows_to_frame(chunk, column_names)
+
+
+def stream_dean_list_excel(excel_file, semester, year, chunk_size=DEAN_LIST_BATCH_SIZE, debug=None,
+                           progress_callback=None):
+    """
+    Import a Dean's List workbook without loading it into memory.
+
+    The sheet is read with openpyxl in read-only mode. The header is located
+    while streaming, then data rows are converted and written to the database
+    one chunk of chunk_size rows at a time inside a single transaction, so
+    memory use does not grow with the size of the file.
+
+    If given, progress_callback(rows_parsed, students_saved, rows_rejected)
+    is called after every chunk.
+
+    Returns a tuple (header_row_number, students_saved, rejected_rows) where
+    header_row_number is the 1-based spreadsheet row of the header.
+    """
+    from django.db import transaction
+    from openpyxl import load_workbook
+    from .models import DeanListStudent
+
+    if debug is None:
+        from django.conf import settings
+        debug = getattr(settings, 'DEAN_LIST_DEBUG', False)
+
+    try:
+        workbook = load_workbook(excel_file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValueError(f"Error processing Excel file: {str(e)}")
+
+    try:
+        rows = enumerate(workbook.worksheets[0].iter_rows(values_only=True), start=1)
+
+        header_row_number, header_values, remaining_rows = _find_streamed_header(rows, debug=debug)
+        if header_row_number is None:
+            raise ValueError("Could not find a valid header row in the Excel file")
+
+        column_names = _header_column_names(header_values)
+        columns = resolve_dean_list_columns(column_names, debug=debug)
+        if not _has_essential_columns(columns):
+            raise ValueError("Could not find essential columns (student name or ID)")
 
-def find_header_row(df):
+        dean_list = _get_dean_list(semester, year)
+        rows_parsed = 0
+        students_saved = 0
+        rejected_rows = []
+
+        with transaction.atomic():
+            for chunk in iter_dean_list_chunks(chain(remaining_rows, rows), column_names, chunk_size):
+                students, rejected = build_dean_list_students(chunk, columns, dean_list)
+                DeanListStudent.objects.bulk_create(students, batch_size=chunk_size)
+                rows_parsed += len(chunk)
+                students_saved += len(students)
+                rejected_rows.extend(rejected)
+                if progress_callback:
+                    progress_callback(rows_parsed, students_saved, len(rejected_rows))
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.exception("Dean's List import of %s %s failed", semester, year)
+        raise ValueError(f"Error processing Excel file: {str(e)}")
+    finally:
+        workbook.close()
+
+    logger.info("Dean's List %s %s: header at row %s, %s students saved, %s rows rejected",
+                semester, year, header_row_number, students_saved, len(rejected_rows))
+    from .context_processors import invalidate_user_stats
+    invalidate_user_stats()  # bulk_create sends no post_save signals
+    invalidate_merged_dean_list(year)
+    cleanup_invalid_dean_list_records(dean_list=dean_list)
+    update_dean_list_rankings(dean_list)
+    return header_row_number, students_saved, rejected_rows
+
+
+def find_header_row(df, debug=False):
     """
     Find the first row that:
     1. Has no numbers (likely contains column headers)
     2. Has at least 3 non-empty fields
+
+    All cells are classified in a single vectorized pass. A cell counts as a
+    number when it holds an int or float, is a string of digits only, or more
+    than 70% of its characters are digits (so "3.5" or "inf" are text).
+    Returns the index label of the header row, or None.
     """
-    print("=== SEARCHING FOR HEADER ROW ===")
-    for index, row in df.iterrows():
-   
-        non_empty_count = row.notna().sum()
-        print(f"Row {index}: {non_empty_count} non-empty values")
-        
-
-        non_empty_values = [str(val) for val in row.dropna().tolist()]
-        print(f"  Values: {non_empty_values}")
-        
-
-        if non_empty_count >= 3:
-
-            has_numbers = False
-            number_details = []
-            
-            for value in row.dropna():
-  
-                if isinstance(value, (int, float)) and not pd.isna(value):
-                    has_numbers = True
-                    number_details.append(f"numeric value: {value}")
-                    break
-                elif isinstance(value, str):
-
-                    numeric_chars = len(re.findall(r'\d', value))
-                    total_chars = len(value.strip())
-                    
-  
-                    if total_chars > 0:
-                        if value.strip().isdigit():  
-                            has_numbers = True
-                            number_details.append(f"pure number string: '{value}'")
-                            break
-                        elif numeric_chars > total_chars * 0.7:  
-                            has_numbers = True
-                            number_details.append(f"mostly numeric: '{value}' ({numeric_chars}/{total_chars} digits)")
-                            break
-            
-            print(f"  Has numbers: {has_numbers}")
-            if number_details:
-                print(f"  Number details: {number_details}")
-
-            if not has_numbers:
-                print(f"*** HEADER ROW FOUND AT INDEX {index} ***")
-                print(f"    Row content: {row.tolist()}")
-                return index
-            else:
-                print(f"  Skipping row {index} - contains numbers")
+    filled_counts = df.notna().sum(axis=1)
 
-    
-    print("No valid header row found")
-    return None
+    # One entry per non-empty cell, indexed by (row, column)
+    cells = df.stack(future_stack=True).dropna()
+    text = cells.astype(str).str.strip()
+    digit_counts = text.str.count(r'\d')
+    is_number = (
+        cells.map(lambda value: isinstance(value, (int, float))).astype(bool)
+        | (cells.map(lambda value: isinstance(value, str)).astype(bool) & text.str.isdigit())
+        | ((text.str.len() > 0) & (digit_counts > text.str.len() * HEADER_MAX_DIGIT_RATIO))
+    )
+    rows_with_numbers = is_number.groupby(level=0).any().reindex(df.index, fill_value=False)
+
+    candidates = (filled_counts >= HEADER_MIN_FILLED_CELLS) & ~rows_with_numbers
+
+    if debug:
+        for index in df.index:
+            logger.debug("Row %s: %s non-empty values, has numbers: %s",
+                         index, filled_counts[index], rows_with_numbers[index])
+            if candidates[index]:
+                break
+
+    if not candidates.any():
+        if debug:
+            logger.debug("No valid header row found")
+        return None
+
+    header_index = candidates.idxmax()
+    if debug:
+        logger.debug("Header row found at index %s: %s", header_index, df.loc[header_index].tolist())
+    return header_index
+
+
+# Common diacritics (تشكيل) and zero-width characters removed during normalization
+_ARABIC_DIACRITICS = [
+    '\u064B',  # فتحتان
+    '\u064C',  # ضمتان
+    '\u064D',  # كسرتان
+    '\u064E',  # فتحة
+    '\u064F',  # ضمة
+    '\u0650',  # كسرة
+    '\u0651',  # شدة
+    '\u0652',  # سكون
+    '\u0653',  # مدة
+    '\u0654',  # همزة علوية
+    '\u0655',  # همزة سفلية
+    '\u0656',  # subscript alef
+    '\u0657',  # inverted damma
+    '\u0658',  # mark noon ghunna
+    '\u0659',  # zwarakay
+    '\u065A',  # vowel sign small v above
+    '\u065B',  # vowel sign inverted small v above
+    '\u065C',  # vowel sign dot below
+    '\u065D',  # reversed damma
+    '\u065E',  # fatha with two dots
+    '\u065F',  # wavy hamza below
+    '\u0670',  # superscript alef
+    '\u200B',  # zero-width space
+]
+
+_ARABIC_NORMALIZATION_TABLE = str.maketrans({
+    **{diacritic: None for diacritic in _ARABIC_DIACRITICS},
+    'أ': 'ا',  # Alef with hamza above
+    'إ': 'ا',  # Alef with hamza below
+    'آ': 'ا',  # Alef with madda above
+    'ة': 'ه',  # Teh marbuta to heh
+    'ى': 'ي',  # Alef maksura to yeh
+    'ئ': 'ي',  # Yeh with hamza above
+})
+
+_WHITESPACE_RE = re.compile(r'\s+')
 
 
 def normalize_arabic_text(text):
@@ -291,90 +475,46 @@ def normalize_arabic_text(text):
     3. Normalizing different forms of letters
     4. Standardizing spaces
     """
-    if pd.isna(text) or text is None:
+    if text is None or pd.isna(text):
         return ""
-    
-    text = str(text).strip()
-    
-    # Remove common diacritics (تشكيل)
-    diacritics = [
-        '\u064B',  # فتحتان
-        '\u064C',  # ضمتان
-        '\u064D',  # كسرتان
-        '\u064E',  # فتحة
-        '\u064F',  # ضمة
-        '\u0650',  # كسرة
-        '\u0651',  # شدة
-        '\u0652',  # سكون
-        '\u0653',  # مدة
-        '\u0654',  # همزة علوية
-        '\u0655',  # همزة سفلية
-        '\u0656',  # subscript alef
-        '\u0657',  # inverted damma
-        '\u0658',  # mark noon ghunna
-        '\u0659',  # zwarakay
-        '\u065A',  # vowel sign small v above
-        '\u065B',  # vowel sign inverted small v above
-        '\u065C',  # vowel sign dot below
-        '\u065D',  # reversed damma
-        '\u065E',  # fatha with two dots
-        '\u065F',  # wavy hamza below
-        '\u0670',  # superscript alef
-    ]
-    
-    for diacritic in diacritics:
-        text = text.replace(diacritic, '')
-    
-    # Normalize letter variations
-    # Different forms of Alef
-    text = text.replace('أ', 'ا')  # Alef with hamza above
-    text = text.replace('إ', 'ا')  # Alef with hamza below
-    text = text.replace('آ', 'ا')  # Alef with madda above
-    
-    # Different forms of Teh Marbuta
-    text = text.replace('ة', 'ه')  # Teh marbuta to heh
-    
-    # Different forms of Yeh
-    text = text.replace('ى', 'ي')  # Alef maksura to yeh
-    text = text.replace('ئ', 'ي')  # Yeh with hamza above
-    
-    # Normalize spaces (including Arabic spaces)
-    text = re.sub(r'\s+', ' ', text)  # Multiple spaces to single space
-    text = text.replace('\u00A0', ' ')  # Non-breaking space to regular space
-    text = text.replace('\u200B', '')  # Zero-width space
-    
-    return text.strip()
 
+    text = str(text).translate(_ARABIC_NORMALIZATION_TABLE)
+    return _WHITESPACE_RE.sub(' ', text).strip()
 
-def find_column_by_normalized_names(df, possible_names):
-    """
-    Find a column in the DataFrame by checking multiple possible names using normalization.
-    Returns the first matching column name found, or None if not found.
-    """
-    # Normalize the possible names
-    normalized_possible = [normalize_arabic_text(name) for name in possible_names]
-    
-    # Check each column in the DataFrame
-    for col in df.columns:
-        normalized_col = normalize_arabic_text(col)
-        if normalized_col in normalized_possible:
-            return col
-    return None
+
+# Normalized column header -> (field, preference), built once at import time
+_COLUMN_LOOKUP = {}
+for _field, _names in DEAN_LIST_COLUMN_NAMES.items():
+    for _preference, _name in enumerate(_names):
+        _COLUMN_LOOKUP.setdefault(normalize_arabic_text(_name), (_field, _preference))
 
 
-def find_column_by_names(df, possible_names):
+def resolve_dean_list_columns(columns, debug=False):
     """
-    Find a column in the DataFrame by checking multiple possible names.
-    First tries exact match, then tries normalized match.
-    Returns the first matching column name found, or None if not found.
+    Map each DeanListStudent field to the spreadsheet column holding it.
+
+    Every column header is normalized once and looked up in the precompiled
+    alias table. When several columns match the same field, the one whose
+    alias appears first in DEAN_LIST_COLUMN_NAMES wins.
+    Returns a dictionary of field -> column name (None when not found).
     """
-    # First try exact matches
-    for name in possible_names:
-        if name in df.columns:
-            return name
-    
-    # If no exact match, try normalized matching
-    return find_column_by_normalized_names(df, possible_names)
+    resolved = {field: None for field in DEAN_LIST_COLUMN_NAMES}
+    best_preference = {}
+
+    for column in columns:
+        match = _COLUMN_LOOKUP.get(normalize_arabic_text(column))
+        if match is None:
+            continue
+        field, preference = match
+        if field not in best_preference or preference < best_preference[field]:
+            resolved[field] = column
+            best_preference[field] = preference
+
+    if debug:
+        for field, column in resolved.items():
+            logger.debug("Dean's List column %s: %s", field, column)
+
+    return resolved
 
 
 def get_numeric_value(row, column_name, default=0):
@@ -394,90 +534,98 @@ def get_numeric_value(row, column_name, default=0):
         return default
 
 
-def cleanup_invalid_dean_list_records():
+def invalid_dean_list_student_filter():
+    """
+    Build a Q object matching DeanListStudent records whose student_name or
+    student_id is empty, whitespace only, or a stringified blank such as
+    'nan', 'none' or 'null'.
+    """
+    from django.db.models import Q
+
+    invalid = Q()
+    for field in ('student_name', 'student_id'):
+        invalid |= Q(**{f'{field}__isnull': True})
+        invalid |= Q(**{f'{field}__regex': r'^\s*$'})
+        for value in INVALID_TEXT_VALUES:
+            if value:
+                invalid |= Q(**{f'{field}__iexact': value})
+    return invalid
+
+
+def _invalid_dean_list_reason(record):
+    """
+    Describe why a record matched invalid_dean_list_student_filter.
+    """
+    reason = []
+    for field in ('student_name', 'student_id'):
+        value = record[field]
+        if not value or value.strip() == '':
+            reason.append(f"empty {field}")
+        elif value.lower() in INVALID_TEXT_VALUES:
+            reason.append(f"invalid {field} (nan/none/null)")
+    return ', '.join(reason)
+
+
+def cleanup_invalid_dean_list_records(dean_list=None, semester=None, year=None):
     """
     Clean up the database by removing any DeanListStudent records 
     with NaN, empty, or invalid student_id or student_name fields.
-    
-    Returns a dictionary with cleanup statistics.
+
+    The offending rows are removed with a single filtered DELETE. Pass a
+    dean_list (instance or id), or a semester and/or year, to only clean
+    the rows of one upload; with no arguments the whole table is cleaned.
+
+    Returns a dictionary with cleanup statistics for the cleaned scope.
     """
     from .models import DeanListStudent
-    
+
     print("=== STARTING DATABASE CLEANUP ===")
-    
-    # Get all DeanListStudent records
-    all_students = DeanListStudent.objects.all()
-    total_count = all_students.count()
-    print(f"Total records in database: {total_count}")
-    
+
+    scope = DeanListStudent.objects.all()
+    if dean_list is not None:
+        scope = scope.filter(dean_list=dean_list)
+    if semester is not None:
+        scope = scope.filter(semester=semester)
+    if year is not None:
+        scope = scope.filter(year=year)
+
+    total_count = scope.count()
+    print(f"Total records in scope: {total_count}")
+
     if total_count == 0:
-        print("No records found in database.")
-        return {'deleted': 0, 'total': 0, 'remaining': 0}
-    
+        print("No records found in scope.")
+        return {'deleted': 0, 'total': 0, 'remaining': 0, 'invalid_records': []}
+
+    invalid = scope.filter(invalid_dean_list_student_filter())
+    invalid_records = [
+        {**record, 'reason': _invalid_dean_list_reason(record)}
+        for record in invalid.values('id', 'student_name', 'student_id', 'semester', 'year')
+    ]
+
     deleted_count = 0
-    invalid_records = []
-    
-    # Check each record for invalid data
-    for student in all_students:
-        should_delete = False
-        reason = []
-        
-        # Check student_name
-        if not student.student_name or student.student_name.strip() == '':
-            should_delete = True
-            reason.append("empty student_name")
-        elif str(student.student_name).lower() in ['nan', 'none', 'null']:
-            should_delete = True
-            reason.append("invalid student_name (nan/none/null)")
-        
-        # Check student_id
-        if not student.student_id or student.student_id.strip() == '':
-            should_delete = True
-            reason.append("empty student_id")
-        elif str(student.student_id).lower() in ['nan', 'none', 'null']:
-            should_delete = True
-            reason.append("invalid student_id (nan/none/null)")
-        
-        if should_delete:
-            invalid_records.append({
-                'id': student.id,
-                'student_name': student.student_name,
-                'student_id': student.student_id,
-                'semester': student.semester,
-                'year': student.year,
-                'reason': ', '.join(reason)
-            })
-    
-    # Show what will be deleted
     if invalid_records:
-        print(f"\nFound {len(invalid_records)} invalid records to delete:")
+        print(f"Found {len(invalid_records)} invalid records to delete:")
         for i, record in enumerate(invalid_records[:10]):  # Show first 10
             print(f"  {i+1}. ID={record['id']}, Name='{record['student_name']}', Student_ID='{record['student_id']}' - Reason: {record['reason']}")
-        
+
         if len(invalid_records) > 10:
             print(f"  ... and {len(invalid_records) - 10} more records")
-        
-        # Delete the invalid records
-        print(f"\nDeleting {len(invalid_records)} invalid records...")
-        for record in invalid_records:
-            try:
-                student = DeanListStudent.objects.get(id=record['id'])
-                student.delete()
-                deleted_count += 1
-            except DeanListStudent.DoesNotExist:
-                print(f"Warning: Record with ID {record['id']} not found (may have been already deleted)")
-            except Exception as e:
-                print(f"Error deleting record ID {record['id']}: {str(e)}")
-    
-    remaining_count = DeanListStudent.objects.count()
-    
+
+        deleted_count, _ = invalid.delete()
+
+        from .context_processors import invalidate_user_stats
+        invalidate_user_stats()
+        for invalid_year in {record['year'] for record in invalid_records}:
+            invalidate_merged_dean_list(invalid_year)
+
+    remaining_count = total_count - deleted_count
+
     print(f"\n=== CLEANUP SUMMARY ===")
     print(f"Total records before cleanup: {total_count}")
     print(f"Invalid records deleted: {deleted_count}")
     print(f"Records remaining: {remaining_count}")
-    print(f"Cleanup completed successfully.")
     print("=== END CLEANUP ===\n")
-    
+
     return {
         'deleted': deleted_count,
         'total': total_count,
@@ -510,8 +658,98 @@ def delete_dean_list_students(semester, year):
             deleted_count += 1
         except Exception as e:
             print(f"Error deleting record ID {student.id}: {str(e)}")
-    
+
+    from .context_processors import invalidate_user_stats
+    invalidate_user_stats()
+    invalidate_merged_dean_list(year)
+
     print(f"Deleted {deleted_count} records for {semester} {year}.")
     print("=== END DELETION ===\n")
     
-    return deleted_count
\ No newline at end of file
+    return deleted_count
+
+def merged_dean_list_rows(year):
+    """
+    Fall and Spring Dean's List entries of a year merged into one row per student.
+
+    The merge runs in the database: rows are grouped by student_id and each
+    semester's values are picked with MAX(CASE WHEN semester = ...). Name and
+    major come from Fall when the student is on both lists. Returns a values()
+    queryset ordered by student_id with the keys student_id, student_name,
+    major, gpa_fall, gpa_spring, credits_passed_fall and credits_passed_spring
+    (None where the student is not on that semester's list).
+    """
+    from django.db.models import Case, DecimalField, IntegerField, Max, Q, When
+    from django.db.models.functions import Coalesce
+    from .models import DeanListStudent
+
+    fall = Q(semester__iexact='fall')
+    spring = Q(semester__iexact='spring')
+
+    def semester_value(condition, field, output_field=None):
+        return Max(Case(When(condition, then=field), output_field=output_field))
+
+    gpa_field = DecimalField(max_digits=3, decimal_places=2)
+    return DeanListStudent.objects.filter(fall | spring, year=year).values('student_id').annotate(
+        student_name=Coalesce(semester_value(fall, 'student_name'), semester_value(spring, 'student_name')),
+        major=Coalesce(semester_value(fall, 'student_major'), semester_value(spring, 'student_major')),
+        gpa_fall=semester_value(fall, 'gpa', gpa_field),
+        gpa_spring=semester_value(spring, 'gpa', gpa_field),
+        credits_passed_fall=semester_value(fall, 'passed_credits', IntegerField()),
+        credits_passed_spring=semester_value(spring, 'passed_credits', IntegerField()),
+    ).order_by('student_id')
+
+
+# The cache is per process and rows can be edited without any signal (admin,
+# shell, bulk updates), so entries are checked against merged_dean_list_signature()
+# on every read and expire after a few minutes to catch edits it cannot see
+MERGED_DEAN_LIST_CACHE_TIMEOUT = 60 * 5
+
+
+def merged_dean_list_cache_key(year):
+    return f'merged_dean_list_{year}'
+
+
+def merged_dean_list_signature(year):
+    """Cheap fingerprint of a year's Dean's List rows, changes when rows are added, removed or re-graded"""
+    from django.db.models import Count, Max, Sum
+    from .models import DeanListStudent
+
+    stats = DeanListStudent.objects.filter(year=year).aggregate(
+        count=Count('id'), last_id=Max('id'), gpa=Sum('gpa'), credits=Sum('passed_credits'),
+    )
+    return stats['count'], stats['last_id'], str(stats['gpa']), stats['credits']
+
+
+def get_merged_dean_list(year):
+    """Formatted merged Fall/Spring rows for a year, cached while that year's signature is unchanged"""
+    from django.core.cache import cache
+
+    key = merged_dean_list_cache_key(year)
+    signature = merged_dean_list_signature(year)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    merged = [format_merged_dean_list_row(row) for row in merged_dean_list_rows(year)]
+    cache.set(key, (signature, merged), MERGED_DEAN_LIST_CACHE_TIMEOUT)
+    return merged
+
+
+def invalidate_merged_dean_list(year):
+    """Drop the cached merged list of a year"""
+    from django.core.cache import cache
+
+    cache.delete(merged_dean_list_cache_key(year))
+
+
+def format_merged_dean_list_row(row):
+    """Display values for a merged_dean_list_rows() row: 'N/A' for a missing semester, GPAs to 2 places"""
+    formatted = dict(row)
+    for key in ('gpa_fall', 'gpa_spring'):
+        if formatted[key] is not None:
+            formatted[key] = Decimal(formatted[key]).quantize(Decimal('0.01'))
+    for key in ('gpa_fall', 'gpa_spring', 'credits_passed_fall', 'credits_passed_spring'):
+        if formatted[key] is None:
+            formatted[key] = 'N/A'
+    return formatted
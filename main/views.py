@@ -3,7 +3,7 @@ from .models import Application, ExchangeApplication, ExchangeNomination, Partne
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.db import IntegrityError
-from django.http import HttpResponse, HttpResponseRedirect, HttpResponseForbidden
+from django.http import HttpResponse, HttpResponseRedirect, HttpResponseForbidden, HttpResponseBadRequest
 from django.shortcuts import render
 from django.urls import reverse
 from django.core.paginator import Paginator
@@ -12,16 +12,17 @@ from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.files.base import ContentFile
 from datetime import datetime, timedelta
-from .utils import process_dean_list_excel
+from concurrent.futures import ThreadPoolExecutor
+from .utils import stream_dean_list_excel, merged_dean_list_rows, format_merged_dean_list_row, get_merged_dean_list
 from django.contrib import messages
 from django.db.models import Q, Count
+import io
 import random
+import threading
 from decimal import Decimal, InvalidOperation
 import os
 import re
 from .forms import EventForm, ExchangeApplicationForm, PartnerUniversityForm, BulkPartnerUniversityForm
-import requests
-from django.http import HttpResponse, HttpResponseBadRequest
 from urllib.parse import urlparse, quote
 from django.views.decorators.http import require_POST
 from django.shortcuts import get_object_or_404
@@ -296,41 +297,28 @@ def student_guide(request):
 def course_descriptions(request):
     """Course descriptions and syllabuses page"""
     try:
-        from .models import Course
+        from .course_search import get_course_index
         from django.core.paginator import Paginator
         
-        # Get all courses ordered by course ID
-        courses = Course.objects.filter(is_active=True).order_by('course_id')
+        # Active courses ordered by course ID, served from the in-process search index
+        index = get_course_index()
         
-        # Filter by department if requested
         department = request.GET.get('department')
-        if department:
-            courses = courses.filter(department=department)
-        
-        # Search functionality
         search_query = request.GET.get('search')
-        if search_query:
-            courses = courses.filter(
-                Q(course_id__icontains=search_query) | 
-                Q(course_name__icontains=search_query)
-            )
+        courses = index.search(search_query, department)
         
         # Pagination
         paginator = Paginator(courses, 25)  # Show 25 courses per page
         page_number = request.GET.get('page')
         page_obj = paginator.get_page(page_number)
         
-        # Get unique departments for filter dropdown
-        departments_queryset = Course.objects.filter(is_active=True).values_list('department', flat=True)
-        departments = list(set([dept for dept in departments_queryset if dept]))  # Use set() to ensure uniqueness
-        
         context = {
             'page_obj': page_obj,
             'courses': page_obj,
-            'departments': sorted(departments),
+            'departments': index.departments,
             'current_department': department,
             'search_query': search_query,
-            'total_courses': courses.count(),
+            'total_courses': paginator.count,
         }
         
     except Exception as e:
@@ -347,6 +335,30 @@ def course_descriptions(request):
     
     return render(request, 'frontend/course_descriptions.html', context)
 
+def course_autocomplete(request):
+    """JSON course suggestions for the course descriptions search box (?q=&limit=)"""
+    from .course_search import get_course_index
+    
+    query = request.GET.get('q', '')
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 25)
+    except ValueError:
+        limit = 10
+    
+    courses = get_course_index().autocomplete(query, limit)
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'course_id': course.course_id,
+                'course_name': course.course_name,
+                'department': course.department,
+                'syllabus_url': course.syllabus_url,
+            }
+            for course in courses
+        ],
+    })
+
 def apply(request):
     if request.method == 'POST':
         name = request.POST.get('name')
@@ -470,81 +482,63 @@ def parking_management(request):
     """
     from .models import ParkingApplication, DeanListStudent
     from decimal import Decimal
+    from django.db.models import BooleanField, Case, DecimalField, Exists, OuterRef, Subquery, Value, When
     
     # Get latest Dean's List info for verification
     latest_dean_list = DeanListStudent.objects.order_by('-year', '-semester').values('semester', 'year').first()
     
-    # Get all parking applications ordered by GPA (highest first)
-    all_applications = ParkingApplication.objects.all()
-    
-    # Separate eligible and ineligible applications
-    eligible_apps = []
-    ineligible_apps = []
-    
-    for app in all_applications:
-        # Check eligibility criteria
-        gpa_check = app.gpa >= Decimal('3.5')
-        license_check = app.has_kuwaiti_license
-        
-        # Check if in latest Dean's List
-        deans_list_check = False
-        if latest_dean_list:
-            deans_list_check = DeanListStudent.objects.filter(
-                student_id=app.student_id,
-                semester=latest_dean_list['semester'],
-                year=latest_dean_list['year']
-            ).exists()
-        
-        is_eligible = gpa_check and license_check and deans_list_check
-        
-        if is_eligible:
-            eligible_apps.append(app)
-        else:
-            ineligible_apps.append(app)
-    
-    # Eligible apps are already sorted by -gpa, -submitted_at in model Meta ordering
-    # Sort ineligible apps the same way
-    ineligible_apps.sort(key=lambda x: (-x.gpa, -x.submitted_at))
-    
-    # Combine lists with eligible first, then ineligible
-    applications = eligible_apps + ineligible_apps
+    # Annotate every application with its latest Dean's List entry and eligibility,
+    # eligible applications first, each group ordered by GPA (highest first)
+    if latest_dean_list:
+        deans_list_entry = DeanListStudent.objects.filter(
+            student_id=OuterRef('student_id'),
+            semester=latest_dean_list['semester'],
+            year=latest_dean_list['year']
+        )
+        in_deans_list = Exists(deans_list_entry)
+        deans_list_gpa = Subquery(
+            deans_list_entry.values('gpa')[:1],
+            output_field=DecimalField(max_digits=3, decimal_places=2)
+        )
+    else:
+        in_deans_list = Value(False, output_field=BooleanField())
+        deans_list_gpa = Value(None, output_field=DecimalField(max_digits=3, decimal_places=2))
+    
+    applications = ParkingApplication.objects.annotate(
+        in_deans_list=in_deans_list,
+        deans_list_gpa=deans_list_gpa,
+    ).annotate(
+        is_eligible=Case(
+            When(gpa__gte=Decimal('3.5'), has_kuwaiti_license=True, in_deans_list=True, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+    ).order_by('-is_eligible', '-gpa', '-submitted_at')
     
     # Add eligibility status and rejection reasons to each application
     applications_with_status = []
     separator_added = False
+    eligible_applications = 0
+    eligible_gpa_total = Decimal('0')
     
     for app in applications:
-        # Check all eligibility criteria
-        gpa_check = app.gpa >= Decimal('3.5')
-        license_check = app.has_kuwaiti_license
-        
-        deans_list_check = False
-        deans_list_gpa = None  # Store the GPA from Dean's List
-        if latest_dean_list:
-            deans_list_student = DeanListStudent.objects.filter(
-                student_id=app.student_id,
-                semester=latest_dean_list['semester'],
-                year=latest_dean_list['year']
-            ).first()
-            
-            if deans_list_student:
-                deans_list_check = True
-                deans_list_gpa = deans_list_student.gpa
-        
-        is_eligible = gpa_check and license_check and deans_list_check
+        is_eligible = app.is_eligible
+        if is_eligible:
+            eligible_applications += 1
+            eligible_gpa_total += app.gpa
         
         # Add separator before first ineligible application
-        add_separator = not is_eligible and not separator_added and len(eligible_apps) > 0
+        add_separator = not is_eligible and not separator_added and eligible_applications > 0
         if add_separator:
             separator_added = True
         
         # Determine rejection reasons
         rejection_reasons = []
-        if not gpa_check:
+        if app.gpa < Decimal('3.5'):
             rejection_reasons.append(f"GPA below 3.5 ({app.gpa})")
-        if not license_check:
+        if not app.has_kuwaiti_license:
             rejection_reasons.append("No Kuwaiti driver's license")
-        if not deans_list_check:
+        if not app.in_deans_list:
             rejection_reasons.append("Not in latest Dean's List")
         
         # Get major display name
@@ -556,18 +550,18 @@ def parking_management(request):
             'rejection_reasons': rejection_reasons,
             'major_display': major_display,
             'add_separator': add_separator,
-            'deans_list_gpa': deans_list_gpa,  # Add Dean's List GPA
+            # GPA from the latest Dean's List (SQLite returns subquery decimals unquantized)
+            'deans_list_gpa': app.deans_list_gpa.quantize(Decimal('0.01')) if app.deans_list_gpa is not None else None,
         })
     
     # Calculate statistics
     total_applications = len(applications_with_status)
-    eligible_applications = len([app for app in applications_with_status if app['eligible']])
     ineligible_applications = total_applications - eligible_applications
     
     # Average GPA for eligible applications
     avg_gpa = 0
     if eligible_applications > 0:
-        avg_gpa = sum([app['application'].gpa for app in applications_with_status if app['eligible']]) / eligible_applications
+        avg_gpa = eligible_gpa_total / eligible_applications
     
     # Check if user can delete applications
     allowed_roles = ['PRESIDENT', 'VICE_PRESIDENT', 'SECRETARY']
@@ -1202,52 +1196,52 @@ def _refresh_courses_background(username):
         connection.ensure_connection()
         print(f"[Background Task] Database connection established")
         
-        # Step 1: Delete old courses (20% progress)
-        cache.set('course_refresh_status', 'deleting', timeout=3600)
-        cache.set('course_refresh_progress', 10, timeout=3600)
-        cache.set('course_refresh_message', 'Deleting old courses...', timeout=3600)
-        
-        print(f"[Background Task] Counting courses to delete...")
-        deleted_count = Course.objects.count()
-        print(f"[Background Task] Found {deleted_count} courses to delete")
-        
-        print(f"[Background Task] Deleting all courses...")
-        Course.objects.all().delete()
-        print(f"[Background Task] Successfully deleted {deleted_count} old courses")
-        
-        cache.set('course_refresh_progress', 20, timeout=3600)
-        cache.set('course_refresh_message', f'Deleted {deleted_count} old courses', timeout=3600)
-        
-        # Step 2: Fetch new courses (20% -> 70% progress)
+        # Step 1: Fetch the catalog into a staging set and apply the diff in one
+        # transaction (10% -> 70% progress). The live courses stay visible the
+        # whole time and a failed fetch leaves them untouched.
         cache.set('course_refresh_status', 'fetching', timeout=3600)
         cache.set('course_refresh_progress', 30, timeout=3600)
-        cache.set('course_refresh_message', 'Fetching new courses from CMU...', timeout=3600)
+        cache.set('course_refresh_message', 'Fetching courses from CMU...', timeout=3600)
         
-        print(f"[Background Task] Starting fetch_courses command...")
+        print(f"[Background Task] Starting fetch_courses command (sync mode)...")
         
         # Call the command directly without output redirection to avoid hanging in thread
+        from .management.commands.fetch_courses import Command as FetchCoursesCommand
+        fetch_command = FetchCoursesCommand()
         try:
-            call_command('fetch_courses', verbosity=0)  # verbosity=0 to reduce output
-            print(f"[Background Task] fetch_courses command completed successfully")
+            call_command(fetch_command, sync=True, verbosity=0)  # verbosity=0 to reduce output
         except Exception as fetch_error:
             print(f"[Background Task] Error during fetch_courses: {str(fetch_error)}")
             cache.set('course_refresh_status', 'error', timeout=3600)
             cache.set('course_refresh_message', f'Error fetching courses: {str(fetch_error)}', timeout=3600)
             return
         
-        new_count = Course.objects.count()
-        print(f"[Background Task] Successfully fetched {new_count} new courses")
+        sync_stats = fetch_command.sync_stats
+        if sync_stats is None:
+            print(f"[Background Task] fetch_courses did not fetch any courses, catalog left unchanged")
+            cache.set('course_refresh_status', 'error', timeout=3600)
+            cache.set('course_refresh_message', 'Could not fetch courses from CMU, the current catalog was kept', timeout=3600)
+            return
+        
+        new_count = sync_stats['created'] + sync_stats['updated'] + sync_stats['unchanged']
+        deactivated_count = sync_stats['deactivated']
+        print(f"[Background Task] fetch_courses completed: {sync_stats}")
         
         cache.set('course_refresh_progress', 70, timeout=3600)
-        cache.set('course_refresh_message', f'Fetched {new_count} new courses', timeout=3600)
+        cache.set(
+            'course_refresh_message',
+            f"Fetched {new_count} courses ({sync_stats['created']} new, {sync_stats['updated']} updated, "
+            f"{deactivated_count} deactivated)",
+            timeout=3600
+        )
         
-        # Step 3: Cleanup invalid courses (70% -> 90% progress)
+        # Step 2: Cleanup invalid courses (70% -> 90% progress)
         cache.set('course_refresh_status', 'cleaning', timeout=3600)
         cache.set('course_refresh_progress', 80, timeout=3600)
         cache.set('course_refresh_message', 'Cleaning up invalid course IDs...', timeout=3600)
         
         cleanup_count = cleanup_invalid_course_ids()
-        final_count = Course.objects.count()
+        final_count = Course.objects.filter(is_active=True).count()
         
         if cleanup_count > 0:
             print(f"[Background Task] Cleaned up {cleanup_count} invalid course IDs")
@@ -1256,19 +1250,19 @@ def _refresh_courses_background(username):
         cache.set('course_refresh_progress', 90, timeout=3600)
         cache.set('course_refresh_message', f'Cleaned up {cleanup_count} invalid courses', timeout=3600)
         
-        # Step 4: Complete (100% progress)
+        # Step 3: Complete (100% progress)
         cache.set('course_refresh_status', 'completed', timeout=3600)
         cache.set('course_refresh_progress', 100, timeout=3600)
-        cache.set('course_refresh_message', f'Refresh completed! Deleted: {deleted_count}, Fetched: {new_count}, Cleaned: {cleanup_count}, Final: {final_count}', timeout=3600)
+        cache.set('course_refresh_message', f'Refresh completed! Deactivated: {deactivated_count}, Fetched: {new_count}, Cleaned: {cleanup_count}, Final: {final_count}', timeout=3600)
         cache.set('course_refresh_stats', {
-            'deleted': deleted_count,
+            'deactivated': deactivated_count,
             'fetched': new_count,
             'cleaned': cleanup_count,
             'final': final_count
         }, timeout=3600)
         
         print(f"[Background Task] Course refresh completed successfully!")
-        print(f"[Background Task] Summary - Deleted: {deleted_count}, Fetched: {new_count}, Cleaned: {cleanup_count}, Final: {final_count}")
+        print(f"[Background Task] Summary - Deactivated: {deactivated_count}, Fetched: {new_count}, Cleaned: {cleanup_count}, Final: {final_count}")
         
     except Exception as e:
         error_msg = f'Error: {str(e)}'
@@ -1821,21 +1815,42 @@ def newdl(request):
             }
             return render(request, 'frontend/newdl.html', context)      
         try:
+            import tempfile
+            import uuid
+            from django.core.cache import cache
+
             # Create DeanList without storing the file
             dean_list = DeanList.objects.create(
                 semester=semester,
                 year=int(year)
             )
-            
-            # Process the excel file directly without saving it
-            df, header_row, students_saved = process_dean_list_excel(excel_file, semester, year)
-            print(f"Processing completed: header at row {header_row}, {students_saved} students saved")
+
+            # Keep the upload on disk only until the import worker has read it
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
+                for chunk in excel_file.chunks():
+                    tmp_file.write(chunk)
+                tmp_path = tmp_file.name
+
+            job_id = uuid.uuid4().hex
+            cache.set(_dean_list_import_cache_key(job_id), {
+                'job_id': job_id,
+                'status': 'queued',
+                'message': 'Waiting for an import worker...',
+                'semester': semester,
+                'year': int(year),
+                'rows_parsed': 0,
+                'inserted': 0,
+                'rejected': 0,
+                'rejected_rows': [],
+            }, timeout=3600)
+            _dean_list_import_executor.submit(_import_dean_list_background, job_id, tmp_path, semester, year)
+            print(f"Dean's list import {job_id} queued by {request.user.username} for {semester} {year}")
 
             return render(request, 'frontend/newdl.html', {
-                'message': f'Dean\'s list created successfully. {students_saved} students imported.',
+                'job_id': job_id,
                 'years': range(2007, 2046)
-            }) 
-            
+            })
+
         except Exception as e:
             context = {
                 'message': f'Error creating dean\'s list: {str(e)}',
@@ -1849,6 +1864,82 @@ def newdl(request):
     return render(request, 'frontend/newdl.html', context)
 
 
+
+# Dean's list uploads are imported by a small worker pool so the upload
+# request can return as soon as the file is on disk
+_dean_list_import_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='DeanListImport')
+
+# Most rejected rows kept in an import job's status
+DEAN_LIST_IMPORT_MAX_REJECTED_ROWS = 200
+
+
+def _dean_list_import_cache_key(job_id):
+    return f'dean_list_import_{job_id}'
+
+
+def _update_dean_list_import(job_id, **fields):
+    """Merge fields into the cached status of a dean's list import job"""
+    from django.core.cache import cache
+
+    key = _dean_list_import_cache_key(job_id)
+    status = cache.get(key, {'job_id': job_id})
+    status.update(fields)
+    cache.set(key, status, timeout=3600)
+
+
+def _import_dean_list_background(job_id, file_path, semester, year):
+    """Background task to import an uploaded dean's list - runs in the import worker pool"""
+    from django.db import connections
+
+    try:
+        _update_dean_list_import(job_id, status='processing', message='Reading Excel file...')
+
+        def report_progress(rows_parsed, inserted, rejected):
+            _update_dean_list_import(
+                job_id,
+                rows_parsed=rows_parsed,
+                inserted=inserted,
+                rejected=rejected,
+                message=f'Imported {inserted} students from {rows_parsed} rows...',
+            )
+
+        header_row, students_saved, rejected_rows = stream_dean_list_excel(
+            file_path, semester, year, progress_callback=report_progress
+        )
+        print(f"[Dean's List Import {job_id}] Header at row {header_row}, {students_saved} students saved")
+
+        message = f'Dean\'s list created successfully. {students_saved} students imported.'
+        if rejected_rows:
+            message += f' {len(rejected_rows)} rows were skipped.'
+        _update_dean_list_import(
+            job_id,
+            status='completed',
+            message=message,
+            inserted=students_saved,
+            rejected=len(rejected_rows),
+            rejected_rows=rejected_rows[:DEAN_LIST_IMPORT_MAX_REJECTED_ROWS],
+        )
+    except Exception as e:
+        print(f"[Dean's List Import {job_id}] Error: {str(e)}")
+        _update_dean_list_import(job_id, status='error', message=f'Error creating dean\'s list: {str(e)}')
+    finally:
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+        for conn in connections.all():
+            conn.close()
+
+
+@login_required
+def newdl_status(request, job_id):
+    """API endpoint to get the progress of a dean's list import job"""
+    from django.core.cache import cache
+
+    status = cache.get(_dean_list_import_cache_key(job_id))
+    if status is None:
+        return JsonResponse({'error': 'Unknown import job'}, status=404)
+    return JsonResponse(status)
+
+
 def deanslist(request):
     """
     Display dean's list students filtered by semester and year.
@@ -2006,65 +2097,53 @@ def student_search(request):
 
 def calculate_student_rankings(students, user):
     """
-    Calculate rankings for a student across different semesters/years
+    Calculate rankings for a student across different semesters/years.
+
+    Positions are read from the overall_rank/major_rank columns stored at
+    import time; list sizes come from one grouped count query.
     """
-    results = []
-    
-    # Group by semester and year
-    by_semester_year = {}
+    from .utils import update_dean_list_rankings
+
+    # Group by dean's list (one per semester and year)
+    by_dean_list = {}
     for student in students:
-        key = f"{student.semester}_{student.year}"
-        if key not in by_semester_year:
-            by_semester_year[key] = []
-        by_semester_year[key].append(student)
-    
-    # For each semester/year, calculate the student's ranking
-    for semester_year_key, student_list in by_semester_year.items():
-        student = student_list[0]  # Should be only one per semester/year
-        semester = student.semester
-        year = student.year
-        
-        # Get all students for this semester/year, ordered by GPA descending
-        all_students_in_semester = DeanListStudent.objects.filter(
-            semester=semester,
-            year=year
-        ).order_by('-gpa', 'student_name')
-        
-        # Find the overall ranking (1-based)
-        overall_ranking = 1
-        for idx, s in enumerate(all_students_in_semester):
-            if s.student_id == student.student_id:
-                overall_ranking = idx + 1
-                break
-        
-        total_students = all_students_in_semester.count()
-        
-        # Calculate ranking within major
-        students_in_major = DeanListStudent.objects.filter(
-            semester=semester,
-            year=year,
-            student_major=student.student_major
-        ).order_by('-gpa', 'student_name')
-        
-        # Find the major ranking (1-based)
-        major_ranking = 1
-        for idx, s in enumerate(students_in_major):
-            if s.student_id == student.student_id:
-                major_ranking = idx + 1
-                break
-        
-        total_students_in_major = students_in_major.count()
-        
-        # Only show GPA if user is superuser/staff
-        show_gpa = user.is_superuser or user.is_staff
-        
+        by_dean_list.setdefault(student.dean_list_id, student)
+
+    # Rank lists imported before rankings were stored
+    unranked = [dean_list_id for dean_list_id, student in by_dean_list.items()
+                if student.overall_rank is None or student.major_rank is None]
+    if unranked:
+        for dean_list_id in unranked:
+            update_dean_list_rankings(dean_list_id)
+        for student in DeanListStudent.objects.filter(pk__in=[by_dean_list[i].pk for i in unranked]):
+            by_dean_list[student.dean_list_id] = student
+
+    # Count students per dean's list and major in one query
+    totals = {}
+    major_totals = {}
+    for row in DeanListStudent.objects.filter(dean_list_id__in=by_dean_list).values(
+        'dean_list_id', 'student_major'
+    ).annotate(total=Count('id')):
+        totals[row['dean_list_id']] = totals.get(row['dean_list_id'], 0) + row['total']
+        major_totals[(row['dean_list_id'], row['student_major'])] = row['total']
+
+    # Only show GPA if user is superuser/staff
+    show_gpa = user.is_superuser or user.is_staff
+
+    results = []
+    for dean_list_id, student in by_dean_list.items():
+        overall_ranking = student.overall_rank
+        major_ranking = student.major_rank
+        total_students = totals.get(dean_list_id, 0)
+        total_students_in_major = major_totals.get((dean_list_id, student.student_major), 0)
+
         results.append({
             'student': student,
             'ranking': overall_ranking,
             'total_students': total_students,
             'major_ranking': major_ranking,
             'total_students_in_major': total_students_in_major,
-            'semester_display': f"{semester.title()} {year}",
+            'semester_display': f"{student.semester.title()} {student.year}",
             'percentage_rank': round((overall_ranking / total_students) * 100, 1) if total_students > 0 else 0,
             'major_percentage_rank': round((major_ranking / total_students_in_major) * 100, 1) if total_students_in_major > 0 else 0,
             'show_gpa': show_gpa
@@ -2861,8 +2940,9 @@ def manage_event_sections(request, pk):
 def image_proxy(request):
     """Simple image proxy for a small set of allowed hosts.
 
-    Use: /image-proxy/?url=<encoded_url>
+    Use: /image-proxy/?url=<encoded_url>[&w=<width>&fmt=webp|avif|jpeg]
     This avoids embedding issues when third-party hosts send restrictive CORP/CSP headers.
+    With w or fmt a resized thumbnail is served instead of the original.
     """
     url = request.GET.get('url')
     if not url:
@@ -2871,28 +2951,43 @@ def image_proxy(request):
     parsed = urlparse(url)
     host = parsed.netloc.lower()
 
-    # Whitelist hosts known to be safe for proxying. Adjust as needed.
-    allowed_hosts = [
-        'photos.fife.usercontent.google.com',
-        'lh3.googleusercontent.com',
-        'drive.google.com'
-    ]
+    from django.http import StreamingHttpResponse, HttpResponseNotModified
+    from .image_cache import (
+        PROXY_ALLOWED_HOSTS, get_cached_image, get_thumbnail, iter_file, UpstreamImageError
+    )
 
-    if host not in allowed_hosts:
+    # Whitelist hosts known to be safe for proxying. Adjust in image_cache.PROXY_ALLOWED_HOSTS.
+    if host not in PROXY_ALLOWED_HOSTS:
         return HttpResponseBadRequest('Host not allowed')
 
+    # Older links put the Drive file id next to url instead of inside it
+    if host == 'drive.google.com' and 'id' in request.GET and 'id=' not in parsed.query:
+        url = f"{url}&id={request.GET['id']}"
+
+    width = request.GET.get('w')
+    fmt = request.GET.get('fmt')
     try:
-        resp = requests.get(url, stream=True, timeout=10)
-    except Exception as e:
-        return HttpResponseBadRequest('Error fetching image')
+        if width or fmt:
+            image = get_thumbnail(url, width, fmt)
+        else:
+            image = get_cached_image(url)
+    except UpstreamImageError as e:
+        return HttpResponseBadRequest(str(e))
 
-    if resp.status_code != 200:
-        return HttpResponseBadRequest('Upstream returned %s' % resp.status_code)
+    if request.headers.get('If-None-Match') == image.etag:
+        not_modified = HttpResponseNotModified()
+        not_modified['ETag'] = image.etag
+        return not_modified
 
-    content_type = resp.headers.get('Content-Type', 'application/octet-stream')
-    data = resp.content
+    try:
+        image_file = image.open()
+    except OSError:
+        # Evicted between the lookup and now
+        return HttpResponseBadRequest('Error fetching image')
 
-    response = HttpResponse(data, content_type=content_type)
+    response = StreamingHttpResponse(iter_file(image_file), content_type=image.content_type)
+    response['Content-Length'] = str(os.fstat(image_file.fileno()).st_size)
+    response['ETag'] = image.etag
     # We explicitly don't forward CSP/CORP headers from upstream.
     # Allow caching by the browser for a short time; adjust Cache-Control as you prefer.
     response['Cache-Control'] = 'public, max-age=3600'
@@ -2931,45 +3026,48 @@ def events_dashboard(request):
         return redirect('portal')
     
     try:
-        from .models import Event, Attendance
+        from .models import Event
         from datetime import datetime
+        from django.db.models import Case, CharField, Count, Q, Value, When
         
-        events = Event.objects.all().order_by('-start_date')
-        
-        # Add attendance stats and status to each event
-        events_with_stats = []
         now = datetime.now().date()
         
-        for event in events:
-            # Determine event status
-            if event.end_date < now:
-                status = 'past'
-            elif event.start_date > now:
-                status = 'upcoming'
-            else:
-                status = 'ongoing'
-            
-            # Get attendance stats
-            attendances = Attendance.objects.filter(event=event)
-            total = attendances.count()
-            start_count = attendances.filter(present_start=True).count()
-            end_count = attendances.filter(present_end=True).count()
-            
-            event.status = status
-            event.total_registered = total
-            event.start_attendance = start_count
-            event.end_attendance = end_count
-            
-            events_with_stats.append(event)
+        # Attendance stats and status for every event in a single query
+        events = Event.objects.annotate(
+            status=Case(
+                When(end_date__lt=now, then=Value('past')),
+                When(start_date__gt=now, then=Value('upcoming')),
+                default=Value('ongoing'),
+                output_field=CharField(),
+            ),
+            total_registered=Count('attendances'),
+            start_attendance=Count('attendances', filter=Q(attendances__present_start=True)),
+            end_attendance=Count('attendances', filter=Q(attendances__present_end=True)),
+        ).order_by('-start_date', '-id')
+        
+        status_filter = request.GET.get('status', 'all')
+        if status_filter in ('past', 'upcoming', 'ongoing'):
+            events = events.filter(status=status_filter)
+        else:
+            status_filter = 'all'
+        
+        paginator = Paginator(events, 12)  # 12 events per page
+        page_obj = paginator.get_page(request.GET.get('page'))
         
         return render(request, 'frontend/events_dashboard.html', {
-            'events': events_with_stats
+            'events': page_obj.object_list,
+            'page_obj': page_obj,
+            'status_filter': status_filter,
         })
     except Exception as e:
         messages.error(request, f'Error loading events dashboard: {str(e)}')
         return redirect('portal')
 
 
+# Attendance fields returned by event_attendance_data (and allowed in ?fields=)
+ATTENDANCE_DATA_FIELDS = ['student_id', 'student_name', 'email', 'code', 'present_start', 'present_end', 'sections']
+
+
 @login_required
 def event_attendance_data(request, pk):
     """API endpoint to fetch attendance data for a specific event."""
@@ -2982,6 +3080,11 @@ def event_attendance_data(request, pk):
         event = get_object_or_404(Event, pk=pk)
         filter_type = request.GET.get('filter', 'all')
         
+        # Optional ?fields=student_id,student_name,... projection of the attendance list
+        fields = [f.strip() for f in request.GET.get('fields', '').split(',') if f.strip() in ATTENDANCE_DATA_FIELDS]
+        if not fields:
+            fields = ATTENDANCE_DATA_FIELDS
+        
         # Get all attendances for the event
         attendances = Attendance.objects.filter(event=event).order_by('student_name')
         
@@ -2993,42 +3096,193 @@ def event_attendance_data(request, pk):
         elif filter_type == 'both':
             attendances = attendances.filter(present_start=True, present_end=True)
         
-        # Calculate statistics
-        all_attendances = Attendance.objects.filter(event=event)
-        total = all_attendances.count()
-        start_only = all_attendances.filter(present_start=True, present_end=False).count()
-        end_only = all_attendances.filter(present_start=False, present_end=True).count()
-        both = all_attendances.filter(present_start=True, present_end=True).count()
+        # Only load the columns (and sections) the response needs
+        attendances = attendances.only('id', *[f for f in fields if f != 'sections'])
+        if 'sections' in fields:
+            attendances = attendances.prefetch_related('sections')
+        
+        # Calculate statistics in a single conditional-aggregate query
+        stats = Attendance.objects.filter(event=event).aggregate(
+            total=Count('id'),
+            start_only=Count('id', filter=Q(present_start=True, present_end=False)),
+            end_only=Count('id', filter=Q(present_start=False, present_end=True)),
+            both=Count('id', filter=Q(present_start=True, present_end=True)),
+        )
+        
+        # Optional server-side pagination (?page=N&page_size=M)
+        pagination = None
+        if request.GET.get('page'):
+            try:
+                page_size = min(max(int(request.GET.get('page_size', 100)), 1), 500)
+            except ValueError:
+                page_size = 100
+            paginator = Paginator(attendances, page_size)
+            page_obj = paginator.get_page(request.GET.get('page'))
+            attendances = page_obj.object_list
+            pagination = {
+                'page': page_obj.number,
+                'num_pages': paginator.num_pages,
+                'page_size': page_size,
+                'count': paginator.count,
+                'has_next': page_obj.has_next(),
+                'has_previous': page_obj.has_previous(),
+            }
         
         # Format attendance data
         attendance_list = []
         for att in attendances:
-            # Get sections for this attendance
-            sections_list = [f"{s.section_code} ({s.professor_name})" for s in att.sections.all()]
-            
-            attendance_list.append({
-                'student_id': att.student_id,
-                'student_name': att.student_name,
-                'email': att.email or '',
-                'code': att.code,
-                'present_start': att.present_start,
-                'present_end': att.present_end,
-                'sections': ', '.join(sections_list) if sections_list else 'N/A',
-            })
+            row = {}
+            for field in fields:
+                if field == 'sections':
+                    # Sections come from the prefetch cache, not one query per attendee
+                    sections_list = [f"{s.section_code} ({s.professor_name})" for s in att.sections.all()]
+                    row['sections'] = ', '.join(sections_list) if sections_list else 'N/A'
+                elif field == 'email':
+                    row['email'] = att.email or ''
+                else:
+                    row[field] = getattr(att, field)
+            attendance_list.append(row)
         
-        return JsonResponse({
-            'stats': {
-                'total': total,
-                'start_only': start_only,
-                'end_only': end_only,
-                'both': both,
-            },
+        data = {
+            'stats': stats,
             'attendances': attendance_list
-        })
+        }
+        if pagination:
+            data['pagination'] = pagination
+        return JsonResponse(data)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+class _ZipStreamBuffer:
+    """Write-only file object that collects zipfile output until the generator yields it"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _event_export_styles():
+    """Named styles shared by every cell of an event section workbook"""
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    return [
+        NamedStyle(name='export_title', font=Font(bold=True, size=14, color="FFFFFF"),
+                   fill=PatternFill(start_color="2C3E50", end_color="2C3E50", fill_type="solid"),
+                   alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle(name='export_section', font=Font(bold=True, size=12, color="FFFFFF"),
+                   fill=PatternFill(start_color="3498DB", end_color="3498DB", fill_type="solid"),
+                   alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle(name='export_date', font=Font(italic=True, size=10),
+                   alignment=Alignment(horizontal='center')),
+        NamedStyle(name='export_header', font=Font(bold=True, color="FFFFFF", size=11),
+                   fill=PatternFill(start_color="34495E", end_color="34495E", fill_type="solid"),
+                   alignment=Alignment(horizontal='center', vertical='center'), border=border),
+        NamedStyle(name='export_cell', border=border),
+        NamedStyle(name='export_yes', font=Font(color="27AE60", bold=True),
+                   alignment=Alignment(horizontal='center'), border=border),
+        NamedStyle(name='export_no', font=Font(color="E74C3C", bold=True),
+                   alignment=Alignment(horizontal='center'), border=border),
+        NamedStyle(name='export_summary', font=Font(bold=True, size=11),
+                   alignment=Alignment(horizontal='left')),
+    ]
+
+
+def _write_event_section_workbook(event, section, rows, output):
+    """Write one section's attendance report to output with a write-only workbook"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    wb = Workbook(write_only=True)
+    for style in _event_export_styles():
+        wb.add_named_style(style)
+    ws = wb.create_sheet(title=f"{section.section_code[:25]}")  # Excel sheet name limit is 31 chars
+
+    def cell(value, style):
+        c = WriteOnlyCell(ws, value=value)
+        c.style = style
+        return c
+
+    # Adjust column widths
+    for column, width in zip('ABCDE', [15, 30, 30, 18, 18]):
+        ws.column_dimensions[column].width = width
+
+    # Title, section info and event date rows
+    date_str = f"Event Date: {event.start_date}"
+    if event.end_date and event.end_date != event.start_date:
+        date_str += f" to {event.end_date}"
+    # Row heights must be set before the rows are appended (each row is written immediately)
+    for row_num, height in ((1, 30), (2, 25), (3, 20), (5, 25)):
+        ws.row_dimensions[row_num].height = height
+    ws.append([cell(f"{event.title} - Attendance Report", 'export_title')])
+    ws.append([cell(f"Section: {section.section_code} - Professor: {section.professor_name}", 'export_section')])
+    ws.append([cell(date_str, 'export_date')])
+    for merged in ('A1:E1', 'A2:E2', 'A3:E3'):
+        ws.merged_cells.add(merged)
+    ws.append([])
+
+    # Headers
+    headers = ['Student ID', 'Student Name', 'Email', 'Attended Start', 'Attended End']
+    ws.append([cell(header, 'export_header') for header in headers])
+
+    # Data rows
+    for student_id, student_name, email, present_start, present_end in rows:
+        ws.append([
+            cell(student_id, 'export_cell'),
+            cell(student_name, 'export_cell'),
+            cell(email or 'N/A', 'export_cell'),
+            cell('Yes' if present_start else 'No', 'export_yes' if present_start else 'export_no'),
+            cell('Yes' if present_end else 'No', 'export_yes' if present_end else 'export_no'),
+        ])
+
+    # Add summary row
+    summary_row = len(rows) + 7
+    ws.append([])
+    ws.append([cell(f"Total Students: {len(rows)}", 'export_summary')])
+    ws.merged_cells.add(f'A{summary_row}:C{summary_row}')
+
+    wb.save(output)
+
+
+def _stream_event_sections_zip(event, sections, rows_by_section, chunk_size=64 * 1024):
+    """Yield a ZIP of per-section workbooks piece by piece as each one is written"""
+    import tempfile
+    import zipfile
+
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for section in sections:
+            safe_section_name = "".join(c for c in section.section_code if c.isalnum() or c in (' ', '-', '_')).strip()
+            safe_prof_name = "".join(c for c in section.professor_name if c.isalnum() or c in (' ', '-', '_')).strip()
+            filename = f"{safe_section_name}_{safe_prof_name}.xlsx"
+
+            with tempfile.TemporaryFile() as excel_file:
+                _write_event_section_workbook(event, section, rows_by_section.get(section.id, []), excel_file)
+                excel_file.seek(0)
+                with zip_file.open(filename, 'w') as entry:
+                    while True:
+                        data = excel_file.read(chunk_size)
+                        if not data:
+                            break
+                        entry.write(data)
+                        yield buffer.pop()
+            yield buffer.pop()
+    yield buffer.pop()
+
+
 @login_required
 def export_event_sections(request, pk):
     """Export event attendance data organized by sections to Excel files (one per section)."""
@@ -3038,139 +3292,36 @@ def export_event_sections(request, pk):
     
     try:
         from .models import Event, EventSection, Attendance
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from django.http import HttpResponse
-        from io import BytesIO
-        import zipfile
+        from django.http import StreamingHttpResponse
+        from collections import defaultdict
         
         event = get_object_or_404(Event, pk=pk)
-        sections = EventSection.objects.filter(event=event).order_by('section_code')
+        sections = list(EventSection.objects.filter(event=event).order_by('section_code'))
         
-        if not sections.exists():
+        if not sections:
             messages.error(request, 'No sections found for this event.')
             return redirect('events_dashboard')
         
-        # Create a zip file to hold multiple Excel files (one per section)
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            
-            for section in sections:
-                # Create a new workbook for each section
-                wb = Workbook()
-                ws = wb.active
-                ws.title = f"{section.section_code[:25]}"  # Excel sheet name limit is 31 chars
-                
-                # Title
-                ws.merge_cells('A1:E1')
-                title_cell = ws['A1']
-                title_cell.value = f"{event.title} - Attendance Report"
-                title_cell.font = Font(bold=True, size=14, color="FFFFFF")
-                title_cell.fill = PatternFill(start_color="2C3E50", end_color="2C3E50", fill_type="solid")
-                title_cell.alignment = Alignment(horizontal='center', vertical='center')
-                ws.row_dimensions[1].height = 30
-                
-                # Section info
-                ws.merge_cells('A2:E2')
-                section_cell = ws['A2']
-                section_cell.value = f"Section: {section.section_code} - Professor: {section.professor_name}"
-                section_cell.font = Font(bold=True, size=12, color="FFFFFF")
-                section_cell.fill = PatternFill(start_color="3498DB", end_color="3498DB", fill_type="solid")
-                section_cell.alignment = Alignment(horizontal='center', vertical='center')
-                ws.row_dimensions[2].height = 25
-                
-                # Event date info
-                ws.merge_cells('A3:E3')
-                date_cell = ws['A3']
-                date_str = f"Event Date: {event.start_date}"
-                if event.end_date and event.end_date != event.start_date:
-                    date_str += f" to {event.end_date}"
-                date_cell.value = date_str
-                date_cell.font = Font(italic=True, size=10)
-                date_cell.alignment = Alignment(horizontal='center')
-                ws.row_dimensions[3].height = 20
-                
-                # Headers
-                headers = ['Student ID', 'Student Name', 'Email', 'Attended Start', 'Attended End']
-                header_fill = PatternFill(start_color="34495E", end_color="34495E", fill_type="solid")
-                header_font = Font(bold=True, color="FFFFFF", size=11)
-                border = Border(
-                    left=Side(style='thin'),
-                    right=Side(style='thin'),
-                    top=Side(style='thin'),
-                    bottom=Side(style='thin')
-                )
-                
-                for col_num, header in enumerate(headers, 1):
-                    cell = ws.cell(row=5, column=col_num)
-                    cell.value = header
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                    cell.border = border
-                ws.row_dimensions[5].height = 25
-                
-                # Get attendances for this section
-                attendances = Attendance.objects.filter(
-                    event=event,
-                    sections=section
-                ).order_by('student_name')
-                
-                # Data rows
-                row_num = 6
-                for att in attendances:
-                    ws.cell(row=row_num, column=1, value=att.student_id).border = border
-                    ws.cell(row=row_num, column=2, value=att.student_name).border = border
-                    ws.cell(row=row_num, column=3, value=att.email or 'N/A').border = border
-                    
-                    # Attended Start - Yes/No
-                    start_cell = ws.cell(row=row_num, column=4, value='Yes' if att.present_start else 'No')
-                    start_cell.border = border
-                    start_cell.alignment = Alignment(horizontal='center')
-                    if att.present_start:
-                        start_cell.font = Font(color="27AE60", bold=True)
-                    else:
-                        start_cell.font = Font(color="E74C3C", bold=True)
-                    
-                    # Attended End - Yes/No
-                    end_cell = ws.cell(row=row_num, column=5, value='Yes' if att.present_end else 'No')
-                    end_cell.border = border
-                    end_cell.alignment = Alignment(horizontal='center')
-                    if att.present_end:
-                        end_cell.font = Font(color="27AE60", bold=True)
-                    else:
-                        end_cell.font = Font(color="E74C3C", bold=True)
-                    
-                    row_num += 1
-                
-                # Add summary row
-                ws.merge_cells(f'A{row_num + 1}:C{row_num + 1}')
-                summary_cell = ws.cell(row=row_num + 1, column=1)
-                summary_cell.value = f"Total Students: {attendances.count()}"
-                summary_cell.font = Font(bold=True, size=11)
-                summary_cell.alignment = Alignment(horizontal='left')
-                
-                # Adjust column widths
-                ws.column_dimensions['A'].width = 15
-                ws.column_dimensions['B'].width = 30
-                ws.column_dimensions['C'].width = 30
-                ws.column_dimensions['D'].width = 18
-                ws.column_dimensions['E'].width = 18
-                
-                # Save workbook to bytes
-                excel_buffer = BytesIO()
-                wb.save(excel_buffer)
-                excel_buffer.seek(0)
-                
-                # Add to zip file
-                safe_section_name = "".join(c for c in section.section_code if c.isalnum() or c in (' ', '-', '_')).strip()
-                safe_prof_name = "".join(c for c in section.professor_name if c.isalnum() or c in (' ', '-', '_')).strip()
-                filename = f"{safe_section_name}_{safe_prof_name}.xlsx"
-                zip_file.writestr(filename, excel_buffer.getvalue())
-        
-        # Prepare response
-        zip_buffer.seek(0)
-        response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
+        # All attendances with their sections in one query, grouped by section
+        rows_by_section = defaultdict(list)
+        memberships = Attendance.sections.through.objects.filter(
+            attendance__event=event
+        ).order_by('attendance__student_name').values_list(
+            'eventsection_id',
+            'attendance__student_id',
+            'attendance__student_name',
+            'attendance__email',
+            'attendance__present_start',
+            'attendance__present_end',
+        )
+        for section_id, *row in memberships:
+            rows_by_section[section_id].append(row)
+        
+        # Stream the zip (one workbook per section) as it is written
+        response = StreamingHttpResponse(
+            _stream_event_sections_zip(event, sections, rows_by_section),
+            content_type='application/zip'
+        )
         safe_event_name = "".join(c for c in event.title if c.isalnum() or c in (' ', '-', '_')).strip()
         response['Content-Disposition'] = f'attachment; filename="{safe_event_name}_Attendance_by_Section.zip"'
         
@@ -3181,9 +3332,41 @@ def export_event_sections(request, pk):
         return redirect('events_dashboard')
 
 
+class _TemporaryDownload(io.FileIO):
+    """Read-only temp file that deletes itself once the response has been sent"""
+
+    def close(self):
+        super().close()
+        try:
+            os.unlink(self.name)
+        except OSError:
+            pass
+
+
+def _stream_process_output(process, stderr_file, first_chunk, chunk_size=64 * 1024):
+    """Yield a subprocess's stdout in chunks, reaping the process when done or aborted"""
+    try:
+        yield first_chunk
+        for chunk in iter(lambda: process.stdout.read(chunk_size), b''):
+            yield chunk
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            stderr_file.seek(0)
+            print(f"[Database Backup] pg_dump exited with {process.returncode}: "
+                  f"{stderr_file.read().decode(errors='replace')}")
+        stderr_file.close()
+
+
 @login_required
 def backup_database(request):
-    """Download database backup (supports SQLite and PostgreSQL)."""
+    """Download database backup (supports SQLite and PostgreSQL).
+    
+    Both paths stream, so memory use does not grow with the database:
+    SQLite is copied with the online backup API (a consistent snapshot) to a
+    temp file served with FileResponse, and pg_dump's stdout is piped
+    straight into a StreamingHttpResponse.
+    """
     # Only superuser or staff can backup database
     if not (request.user.is_superuser or request.user.is_staff):
         messages.error(request, 'You do not have permission to backup the database.')
@@ -3191,8 +3374,9 @@ def backup_database(request):
     
     try:
         from django.conf import settings
+        from django.http import FileResponse, StreamingHttpResponse
         from datetime import datetime
-        import os
+        import sqlite3
         import subprocess
         import tempfile
         
@@ -3208,12 +3392,24 @@ def backup_database(request):
                 messages.error(request, 'Database file not found.')
                 return redirect('portal')
             
-            # Read the database file
-            with open(db_path, 'rb') as db_file:
-                db_content = db_file.read()
+            # Snapshot the live database page by page with the online backup API
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.sqlite3') as tmp_file:
+                tmp_path = tmp_file.name
+            try:
+                source = sqlite3.connect(db_path)
+                target = sqlite3.connect(tmp_path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+                backup_file = _TemporaryDownload(tmp_path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
             
-            # Create response with database file
-            response = HttpResponse(db_content, content_type='application/x-sqlite3')
+            # Stream the snapshot; the temp file is removed when the response closes it
+            response = FileResponse(backup_file, content_type='application/x-sqlite3')
             response['Content-Disposition'] = f'attachment; filename="dlc_database_backup_{timestamp}.sqlite3"'
             
             messages.success(request, f'Database backup downloaded successfully!')
@@ -3228,47 +3424,43 @@ def backup_database(request):
             db_host = db_config.get('HOST', 'localhost')
             db_port = db_config.get('PORT', '5432')
             
-            # Create temporary file for backup
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.sql') as tmp_file:
-                tmp_path = tmp_file.name
+            # Build pg_dump command
+            env = os.environ.copy()
+            if db_password:
+                env['PGPASSWORD'] = db_password
+            
+            cmd = [
+                'pg_dump',
+                '-h', db_host,
+                '-p', str(db_port),
+                '-U', db_user,
+                '-F', 'c',  # Custom format (compressed), written to stdout
+                db_name
+            ]
+            
+            # stderr goes to a temp file so a chatty pg_dump can never block on a full pipe
+            stderr_file = tempfile.TemporaryFile()
+            process = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=stderr_file)
+            
+            # Wait for the first chunk so connection/auth failures still show an error page
+            first_chunk = process.stdout.read(64 * 1024)
+            if not first_chunk:
+                process.stdout.close()
+                process.wait()
+                stderr_file.seek(0)
+                error = stderr_file.read().decode(errors='replace')
+                stderr_file.close()
+                raise Exception(f'pg_dump failed: {error}')
+            
+            # Create response
+            response = StreamingHttpResponse(
+                _stream_process_output(process, stderr_file, first_chunk),
+                content_type='application/x-postgresql-backup'
+            )
+            response['Content-Disposition'] = f'attachment; filename="dlc_database_backup_{timestamp}.backup"'
             
-            try:
-                # Build pg_dump command
-                env = os.environ.copy()
-                if db_password:
-                    env['PGPASSWORD'] = db_password
-                
-                cmd = [
-                    'pg_dump',
-                    '-h', db_host,
-                    '-p', str(db_port),
-                    '-U', db_user,
-                    '-F', 'c',  # Custom format (compressed)
-                    '-f', tmp_path,
-                    db_name
-                ]
-                
-                # Execute pg_dump
-                result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-                
-                if result.returncode != 0:
-                    raise Exception(f'pg_dump failed: {result.stderr}')
-                
-                # Read the backup file
-                with open(tmp_path, 'rb') as backup_file:
-                    backup_content = backup_file.read()
-                
-                # Create response
-                response = HttpResponse(backup_content, content_type='application/x-postgresql-backup')
-                response['Content-Disposition'] = f'attachment; filename="dlc_database_backup_{timestamp}.backup"'
-                
-                messages.success(request, 'PostgreSQL database backup downloaded successfully!')
-                return response
-                
-            finally:
-                # Clean up temporary file
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+            messages.success(request, 'PostgreSQL database backup downloaded successfully!')
+            return response
         
         else:
             messages.error(request, f'Database backup is not supported for {db_engine}.')
@@ -3279,6 +3471,57 @@ def backup_database(request):
         return redirect('portal')
 
 
+_restore_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='DatabaseRestore')
+_active_restore_jobs = set()
+_active_restore_jobs_lock = threading.Lock()
+
+
+def _submit_restore_job(job_id):
+    """Queue a restore job on the restore worker unless it is already running in this process"""
+    with _active_restore_jobs_lock:
+        if job_id in _active_restore_jobs:
+            return False
+        _active_restore_jobs.add(job_id)
+    _restore_executor.submit(_restore_database_background, job_id)
+    return True
+
+
+def _restore_database_background(job_id):
+    """Background task to merge an uploaded database - runs in the restore worker"""
+    from django.db import connections
+    from .database_merge import run_restore_job, fail_restore_job
+
+    try:
+        state = run_restore_job(job_id)
+        print(f"[Database Restore {job_id}] {state['message']}")
+    except Exception as e:
+        print(f"[Database Restore {job_id}] Error: {str(e)}")
+        fail_restore_job(job_id, e)
+    finally:
+        with _active_restore_jobs_lock:
+            _active_restore_jobs.discard(job_id)
+        for conn in connections.all():
+            conn.close()
+
+
+def _restore_database_context(job_id=None):
+    """Template context for the restore page: target database, running job, resumable jobs"""
+    from django.conf import settings
+    from .database_merge import incomplete_restore_jobs
+
+    db_engine = settings.DATABASES['default']['ENGINE']
+    with _active_restore_jobs_lock:
+        active_jobs = set(_active_restore_jobs)
+    return {
+        'current_db': 'PostgreSQL' if ('postgresql' in db_engine or 'psycopg2' in db_engine) else 'SQLite',
+        'import_mode': True,
+        'job_id': job_id,
+        # Jobs left unfinished by a dead or stalled worker (or that failed) can be resumed from their checkpoint
+        'interrupted_jobs': [job for job in incomplete_restore_jobs()
+                             if job['job_id'] not in active_jobs and job['job_id'] != job_id],
+    }
+
+
 @login_required
 def restore_database(request):
     """Merge/Import data from SQLite file into current database.
@@ -3287,9 +3530,10 @@ def restore_database(request):
     - Only adds records that don't already exist
     - Preserves existing data
     - Works with both SQLite and PostgreSQL targets
+    
+    The merge runs as a background job; the page polls restore_database_status
+    and interrupted jobs can be resumed from their last checkpoint.
     """
-    import traceback
-    import sys
     import logging
     
     logger = logging.getLogger(__name__)
@@ -3300,8 +3544,25 @@ def restore_database(request):
         return redirect('portal')
     
     if request.method == 'POST':
+        from .database_merge import create_restore_job, load_restore_job, restore_job_resumable
+        
+        # Resume an interrupted job from its checkpoint
+        resume_job_id = request.POST.get('resume_job')
+        if resume_job_id:
+            state = load_restore_job(resume_job_id)
+            if state is None or state['status'] == 'completed':
+                messages.error(request, 'Unknown or already completed import job.')
+                return redirect('restore_database')
+            with _active_restore_jobs_lock:
+                running_here = resume_job_id in _active_restore_jobs
+            if not running_here and not restore_job_resumable(state):
+                messages.error(request, 'This import job is still running in another worker.')
+                return redirect('restore_database')
+            _submit_restore_job(resume_job_id)
+            logger.info(f"Resuming database import job {resume_job_id} from {state['checkpoint']}")
+            return render(request, 'frontend/restore_database.html', _restore_database_context(resume_job_id))
+        
         tmp_path = None
-        sqlite_conn = None
         try:
             import os
             import sqlite3
@@ -3317,7 +3578,7 @@ def restore_database(request):
             if not uploaded_file:
                 messages.error(request, 'No file uploaded.')
                 logger.error("No file uploaded")
-                return render(request, 'frontend/restore_database.html')
+                return render(request, 'frontend/restore_database.html', _restore_database_context())
 
             logger.info(f"File uploaded: {uploaded_file.name}, size: {uploaded_file.size}")
 
@@ -3325,7 +3586,7 @@ def restore_database(request):
             if not uploaded_file.name.endswith(('.sqlite3', '.db', '.sqlite')):
                 messages.error(request, 'Please upload a SQLite database file (.sqlite3, .db, or .sqlite).')
                 logger.error(f"Invalid file extension: {uploaded_file.name}")
-                return render(request, 'frontend/restore_database.html')
+                return render(request, 'frontend/restore_database.html', _restore_database_context())
 
             # Save uploaded file to temp location
             logger.info("Saving uploaded file to temp location...")
@@ -3345,389 +3606,23 @@ def restore_database(request):
                 conn.close()
                 logger.info("SQLite file is valid")
             except sqlite3.Error as exc:
-                if tmp_path and os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
                 messages.error(request, f'Uploaded file is not a valid SQLite database: {exc}')
                 logger.error(f"Invalid SQLite file: {exc}")
-                return render(request, 'frontend/restore_database.html')
-
-            # Import all models from main app
-            logger.info("Importing models...")
-            from main.models import (
-                User, Application, Event, Attendance,
-                Thread, Reply, DeanList, DeanListStudent, Course, 
-                EventSection, ExchangeApplication, PartnerUniversity
-            )
-            logger.info("Models imported successfully")
-            
-            messages.info(request, 'Starting data import... This may take a few minutes.')
-            messages.warning(request, '⚠️ Large imports may timeout. Keep database files under 1000 records for best results.')
-            
-            # Connect to uploaded SQLite database
-            sqlite_conn = sqlite3.connect(tmp_path)
-            sqlite_conn.row_factory = sqlite3.Row
-            sqlite_cursor = sqlite_conn.cursor()
-            
-            stats = {
-                'users': {'added': 0, 'skipped': 0},
-                'applications': {'added': 0, 'skipped': 0},
-                'exchange_apps': {'added': 0, 'skipped': 0},
-                'events': {'added': 0, 'skipped': 0},
-                'attendance': {'added': 0, 'skipped': 0},
-                'threads': {'added': 0, 'skipped': 0},
-                'replies': {'added': 0, 'skipped': 0},
-                'dean_lists': {'added': 0, 'skipped': 0},
-                'dean_students': {'added': 0, 'skipped': 0},
-                'courses': {'added': 0, 'skipped': 0},
-                'event_sections': {'added': 0, 'skipped': 0},
-            }
-            
-            # Import Users (skip if username exists)
-            try:
-                from django.utils import timezone
-                from datetime import datetime
-                
-                sqlite_cursor.execute("SELECT * FROM main_user")
-                for row in sqlite_cursor.fetchall():
-                    row = dict(row)  # Convert sqlite3.Row to dict
-                    username = row.get('username', '')
-                    if username and not User.objects.filter(username=username).exists():
-                        # Convert naive datetimes to timezone-aware
-                        last_login = row.get('last_login')
-                        if last_login and isinstance(last_login, str):
-                            try:
-                                last_login = timezone.make_aware(datetime.fromisoformat(last_login.replace('Z', '+00:00')))
-                            except:
-                                last_login = None
-                        
-                        date_joined = row.get('date_joined')
-                        if date_joined and isinstance(date_joined, str):
-                            try:
-                                date_joined = timezone.make_aware(datetime.fromisoformat(date_joined.replace('Z', '+00:00')))
-                            except:
-                                date_joined = timezone.now()
-                        elif not date_joined:
-                            date_joined = timezone.now()
-                        
-                        User.objects.create(
-                            username=username,
-                            password=row.get('password', ''),
-                            last_login=last_login,
-                            is_superuser=bool(row.get('is_superuser', 0)),
-                            first_name=row.get('first_name', ''),
-                            last_name=row.get('last_name', ''),
-                            email=row.get('email', ''),
-                            is_staff=bool(row.get('is_staff', 0)),
-                            is_active=bool(row.get('is_active', 1)),
-                            date_joined=date_joined,
-                            is_member=bool(row.get('is_member', 0)),
-                            role=row.get('role', 'MEMBER'),
-                            is_admin=bool(row.get('is_admin', 0)),
-                            is_exchange_officer=bool(row.get('is_exchange_officer', 0))
-                        )
-                        stats['users']['added'] += 1
-                    else:
-                        stats['users']['skipped'] += 1
-            except Exception as e:
-                messages.warning(request, f'User import issue: {str(e)}')
-            
-            # Import Events (skip if title + start_date exists)
-            try:
-                sqlite_cursor.execute("SELECT * FROM main_event")
-                for row in sqlite_cursor.fetchall():
-                    row = dict(row)  # Convert to dict
-                    event_title = row.get('title', '')
-                    start_date = row.get('start_date')
-                    
-                    if event_title and start_date:
-                        if not Event.objects.filter(title=event_title, start_date=start_date).exists():
-                            Event.objects.create(
-                                title=event_title,
-                                description=row.get('description', ''),
-                                start_date=start_date,
-                                end_date=row.get('end_date', start_date),  # Default to start_date if missing
-                                start_time=row.get('start_time'),
-                                end_time=row.get('end_time'),
-                                image_url=row.get('image_url', ''),
-                                created_at=row.get('created_at'),
-                                secret_start_a=row.get('secret_start_a'),
-                                secret_start_b=row.get('secret_start_b'),
-                                secret_start_c=row.get('secret_start_c'),
-                                secret_end_a=row.get('secret_end_a'),
-                                secret_end_b=row.get('secret_end_b'),
-                                secret_end_c=row.get('secret_end_c')
-                            )
-                            stats['events']['added'] += 1
-                        else:
-                            stats['events']['skipped'] += 1
-            except Exception as e:
-                messages.warning(request, f'Event import issue: {str(e)}')
-            
-            # Import Event Sections
-            try:
-                sqlite_cursor.execute("SELECT * FROM main_eventsection")
-                for row in sqlite_cursor.fetchall():
-                    row = dict(row)  # Convert to dict
-                    # Find event by ID from the event we just imported
-                    event_id = row.get('event_id')
-                    if event_id:
-                        # Try to find the event by title+start_date since IDs won't match
-                        sqlite_cursor.execute("SELECT title, start_date FROM main_event WHERE id = ?", (event_id,))
-                        event_data = sqlite_cursor.fetchone()
-                        if event_data:
-                            event_data = dict(event_data)  # Convert to dict
-                            event = Event.objects.filter(
-                                title=event_data['title'], 
-                                start_date=event_data['start_date']
-                            ).first()
-                            if event:
-                                section_code = row.get('section_code', '')
-                                professor_name = row.get('professor_name', '')
-                                if not EventSection.objects.filter(event=event, section_code=section_code).exists():
-                                    EventSection.objects.create(
-                                        event=event,
-                                        section_code=section_code,
-                                        professor_name=professor_name
-                                    )
-                                    stats['event_sections']['added'] += 1
-                                else:
-                                    stats['event_sections']['skipped'] += 1
-            except Exception as e:
-                messages.warning(request, f'Event section import issue: {str(e)}')
-            
-            # Import Applications (skip if student_id exists for the same academic year)
-            try:
-                sqlite_cursor.execute("SELECT * FROM main_application")
-                for row in sqlite_cursor.fetchall():
-                    row = dict(row)  # Convert to dict
-                    student_id = row.get('student_id', '')
-                    # Use time_submitted year to avoid duplicates from same year
-                    if student_id and not Application.objects.filter(student_id=student_id).exists():
-                        Application.objects.create(
-                            student_id=student_id,
-                            name=row.get('name', ''),
-                            email=row.get('email', ''),
-                            phone=row.get('phone', ''),
-                            passed_credits=row.get('passed_credits', 0),
-                            GPA=row.get('GPA', 0.0),
-                            major=row.get('major', ''),
-                            anything_else=row.get('anything_else', '')
-                        )
-                        stats['applications']['added'] += 1
-                    else:
-                        stats['applications']['skipped'] += 1
-            except Exception as e:
-                messages.warning(request, f'Application import issue: {str(e)}')
+                return render(request, 'frontend/restore_database.html', _restore_database_context())
+
+            # Hand the file to the restore worker; the page polls for progress
+            job_id = create_restore_job(tmp_path, request.user.username)
+            tmp_path = None
+            _submit_restore_job(job_id)
+            logger.info(f"Database import job {job_id} queued")
             
-            # Import Exchange Applications
-            # NOTE: Skipping ExchangeApplications because they have required FileField fields
+            # NOTE: ExchangeApplications are skipped because they have required FileField fields
             # (english_proficiency_document, transcript_document, passport_copy)
-            # that cannot be imported from SQLite database
-            try:
-                messages.info(request, 'Skipping Exchange Applications (requires file uploads)')
-                stats['exchange_apps']['skipped'] = 0  # Mark as intentionally skipped
-            except Exception as e:
-                messages.warning(request, f'Exchange application import issue: {str(e)}')
-            
-            # Import Attendance
-            try:
-                sqlite_cursor.execute("SELECT * FROM main_attendance")
-                for row in sqlite_cursor.fetchall():
-                    row = dict(row)  # Convert to dict
-                    # Find event by looking up the event from source DB and matching by title/start_date
-                    event_id = row.get('event_id')
-                    if event_id:
-                        sqlite_cursor.execute("SELECT title, start_date FROM main_event WHERE id = ?", (event_id,))
-                        event_data = sqlite_cursor.fetchone()
-                        if event_data:
-                            event_data = dict(event_data)  # Convert to dict
-                            event = Event.objects.filter(
-                                title=event_data['title'], 
-                                start_date=event_data['start_date']
-                            ).first()
-                            if event:
-                                student_id = row.get('student_id', '')
-                                if student_id and not Attendance.objects.filter(event=event, student_id=student_id).exists():
-                                    # Create attendance record
-                                    attendance = Attendance.objects.create(
-                                        event=event,
-                                        student_id=student_id,
-                                        student_name=row.get('student_name', ''),
-                                        email=row.get('email', ''),
-                                        code=row.get('code', ''),
-                                        present_start=bool(row.get('present_start', 0)),
-                                        present_end=bool(row.get('present_end', 0)),
-                                        recorded_at=row.get('recorded_at')
-                                    )
-                                    
-                                    # Handle sections many-to-many relationship
-                                    try:
-                                        sqlite_cursor.execute(
-                                            "SELECT eventsection_id FROM main_attendance_sections WHERE attendance_id = ?", 
-                                            (row['id'],)
-                                        )
-                                        section_ids = sqlite_cursor.fetchall()
-                                        
-                                        for section_row in section_ids:
-                                            section_id = section_row[0]
-                                            # Get section code from source DB
-                                            sqlite_cursor.execute(
-                                                "SELECT section_code FROM main_eventsection WHERE id = ?", 
-                                                (section_id,)
-                                            )
-                                            section_data = sqlite_cursor.fetchone()
-                                            if section_data:
-                                                section_code = section_data[0]
-                                                # Find section in target DB
-                                                section = EventSection.objects.filter(
-                                                    event=event,
-                                                    section_code=section_code
-                                                ).first()
-                                                if section:
-                                                    attendance.sections.add(section)
-                                    except Exception as section_error:
-                                        # If sections import fails, continue without them
-                                        pass
-                                    
-                                    stats['attendance']['added'] += 1
-                                else:
-                                    stats['attendance']['skipped'] += 1
-            except Exception as e:
-                messages.warning(request, f'Attendance import issue: {str(e)}')
+            # that cannot be imported from SQLite database.
+            # DeanList/DeanListStudent data is managed through the separate upload process.
+            messages.info(request, 'Skipping Exchange Applications (requires file uploads)')
             
-            # Import Threads (Thread model has no author field)
-            try:
-                sqlite_cursor.execute("SELECT * FROM main_thread")
-                for row in sqlite_cursor.fetchall():
-                    row = dict(row)  # Convert to dict
-                    title = row.get('title', '')
-                    content = row.get('content', '')
-                    
-                    # Check if thread with same title already exists
-                    if title and not Thread.objects.filter(title=title).exists():
-                        Thread.objects.create(
-                            title=title,
-                            content=content,
-                            created_at=row.get('created_at'),
-                            is_resolved=bool(row.get('is_resolved', 0))
-                        )
-                        stats['threads']['added'] += 1
-                    else:
-                        stats['threads']['skipped'] += 1
-            except Exception as e:
-                messages.warning(request, f'Thread import issue: {str(e)}')
-            
-            # Import Replies
-            try:
-                sqlite_cursor.execute("SELECT * FROM main_reply")
-                for row in sqlite_cursor.fetchall():
-                    row = dict(row)  # Convert to dict
-                    # Find thread by looking up in source DB
-                    thread_id = row.get('thread_id')
-                    user_id = row.get('user_id')
-                    
-                    if thread_id and user_id:
-                        # Get thread title from source
-                        sqlite_cursor.execute("SELECT title FROM main_thread WHERE id = ?", (thread_id,))
-                        thread_data = sqlite_cursor.fetchone()
-                        
-                        # Get user username from source
-                        sqlite_cursor.execute("SELECT username FROM main_user WHERE id = ?", (user_id,))
-                        user_data = sqlite_cursor.fetchone()
-                        
-                        if thread_data and user_data:
-                            thread_data = dict(thread_data)  # Convert to dict
-                            user_data = dict(user_data)  # Convert to dict
-                            
-                            # Find thread by title (since IDs won't match)
-                            thread = Thread.objects.filter(title=thread_data['title']).first()
-                            # Find user by username
-                            user = User.objects.filter(username=user_data['username']).first()
-                            
-                            if thread and user:
-                                Reply.objects.create(
-                                    thread=thread,
-                                    user=user,
-                                    content=row.get('content', ''),
-                                    created_at=row.get('created_at')
-                                )
-                                stats['replies']['added'] += 1
-                            else:
-                                stats['replies']['skipped'] += 1
-            except Exception as e:
-                messages.warning(request, f'Reply import issue: {str(e)}')
-            
-            # Import Dean Lists (uses semester + year, not name)
-            # Skip DeanList import - not needed for database restore
-            # DeanList data is specific to each semester and managed separately
-            logger.info("Skipping DeanList import (managed separately)")
-            stats['dean_lists']['skipped'] = 0  # Not counting as we're not attempting
-            
-            # Skip Dean List Students import - not needed for database restore
-            # Dean list students are managed through separate upload process
-            logger.info("Skipping DeanListStudent import (managed separately)")
-            stats['dean_students']['skipped'] = 0  # Not counting as we're not attempting
-            
-            # Import Courses
-            try:
-                sqlite_cursor.execute("SELECT * FROM main_course")
-                for row in sqlite_cursor.fetchall():
-                    row = dict(row)  # Convert to dict
-                    course_id = row.get('course_id', '')
-                    course_name = row.get('course_name', '')
-                    
-                    if course_id and not Course.objects.filter(course_id=course_id).exists():
-                        Course.objects.create(
-                            course_id=course_id,
-                            course_name=course_name,
-                            syllabus_url=row.get('syllabus_url', ''),
-                            info_url=row.get('info_url', ''),
-                            department=row.get('department', ''),
-                            credits=row.get('credits'),
-                            is_active=bool(row.get('is_active', 1)),
-                            last_updated=row.get('last_updated'),
-                            created_at=row.get('created_at')
-                        )
-                        stats['courses']['added'] += 1
-                    else:
-                        stats['courses']['skipped'] += 1
-            except Exception as e:
-                messages.warning(request, f'Course import issue: {str(e)}')
-            
-            # Close SQLite connection and clean up
-            try:
-                if sqlite_conn:
-                    sqlite_conn.close()
-                    logger.info("SQLite connection closed successfully")
-            except Exception as e:
-                logger.warning(f"Error closing SQLite connection: {e}")
-            
-            # Delete temp file
-            try:
-                if tmp_path and os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
-                    logger.info(f"Temp file deleted: {tmp_path}")
-            except Exception as e:
-                logger.warning(f"Error deleting temp file: {e}")
-            
-            logger.info("=== DATABASE IMPORT COMPLETED SUCCESSFULLY ===")
-            
-            # Build success message
-            total_added = sum(s['added'] for s in stats.values())
-            total_skipped = sum(s['skipped'] for s in stats.values())
-            
-            messages.success(request, f'✅ Data import completed! Added {total_added} records, skipped {total_skipped} duplicates.')
-            
-            # Detailed stats
-            details = []
-            for model, counts in stats.items():
-                if counts['added'] > 0 or counts['skipped'] > 0:
-                    details.append(f"{model.replace('_', ' ').title()}: +{counts['added']} new, ~{counts['skipped']} existing")
-            
-            if details:
-                messages.info(request, ' | '.join(details))
-            
-            return redirect('portal')
+            return render(request, 'frontend/restore_database.html', _restore_database_context(job_id))
             
         except Exception as e:
             import traceback
@@ -3752,16 +3647,7 @@ def restore_database(request):
                 pass
         
         finally:
-            # ALWAYS close connection and clean up, whether success or error
-            # Close SQLite connection if open
-            if sqlite_conn:
-                try:
-                    sqlite_conn.close()
-                    logger.info("SQLite connection closed in finally block")
-                except Exception as e:
-                    logger.warning(f"Error closing connection in finally: {e}")
-            
-            # Clean up temp file
+            # Clean up temp file unless it was handed to a job
             if tmp_path and os.path.exists(tmp_path):
                 try:
                     os.unlink(tmp_path)
@@ -3770,18 +3656,114 @@ def restore_database(request):
                     logger.warning(f"Could not delete temp file in finally: {cleanup_error}")
             
         # If we had an error, render the form again
-        if 'e' in locals():
-            return render(request, 'frontend/restore_database.html')
+        return render(request, 'frontend/restore_database.html', _restore_database_context())
     
     # GET request - show the upload form
     logger.info("Showing database import form")
-    from django.conf import settings
-    db_engine = settings.DATABASES['default']['ENGINE']
-    context = {
-        'current_db': 'PostgreSQL' if ('postgresql' in db_engine or 'psycopg2' in db_engine) else 'SQLite',
-        'import_mode': True
-    }
-    return render(request, 'frontend/restore_database.html', context)
+    return render(request, 'frontend/restore_database.html', _restore_database_context())
+
+
+@login_required
+def restore_database_status(request, job_id):
+    """API endpoint to get the progress of a database import job"""
+    from .database_merge import load_restore_job
+    
+    if not (request.user.is_superuser or request.user.is_staff):
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    state = load_restore_job(job_id)
+    if state is None:
+        return JsonResponse({'error': 'Unknown import job'}, status=404)
+    with _active_restore_jobs_lock:
+        state['active'] = job_id in _active_restore_jobs
+    return JsonResponse(state)
+
+
+MERGED_DEANS_LIST_HEADERS = ['Student ID', 'Student Name', 'Major', 'GPA Fall', 'GPA Spring',
+                             'Credits Passed Fall', 'Credits Passed Spring']
+
+
+def _merged_deans_list_export_values(row):
+    """Spreadsheet/CSV cells for one merged_dean_list_rows() row"""
+    row = format_merged_dean_list_row(row)
+    return [
+        row['student_id'],
+        row['student_name'],
+        row['major'],
+        str(row['gpa_fall']),
+        str(row['gpa_spring']),
+        str(row['credits_passed_fall']),
+        str(row['credits_passed_spring']),
+    ]
+
+
+def _merged_deans_list_excel_response(rows, year):
+    """Write the merged list with a write-only workbook to a temp file and stream it back"""
+    import tempfile
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill, NamedStyle
+    from django.http import FileResponse
+    
+    wb = Workbook(write_only=True)
+    wb.add_named_style(NamedStyle(
+        name='merged_header',
+        font=Font(bold=True, color='FFFFFF'),
+        fill=PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid'),
+        alignment=Alignment(horizontal='center', vertical='center'),
+    ))
+    ws = wb.create_sheet(title=f"Dean's List {year}")
+    
+    # Adjust column widths
+    for column, width in zip('ABCDEFG', [15, 30, 15, 12, 12, 20, 20]):
+        ws.column_dimensions[column].width = width
+    
+    # Add headers
+    header_cells = []
+    for header in MERGED_DEANS_LIST_HEADERS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.style = 'merged_header'
+        header_cells.append(cell)
+    ws.append(header_cells)
+    
+    # Add data, reading the merged rows in chunks
+    for row in rows.iterator(chunk_size=2000):
+        ws.append(_merged_deans_list_export_values(row))
+    
+    output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'Deans_List_Merged_{year}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def _merged_deans_list_csv_response(rows, year):
+    """Stream the merged list as CSV, emitting rows as the query results arrive"""
+    import csv
+    from django.http import StreamingHttpResponse
+    
+    writer = csv.writer(_Echo())
+    
+    def generate():
+        yield '\ufeff'  # BOM so Excel reads the Arabic names as UTF-8
+        yield writer.writerow(MERGED_DEANS_LIST_HEADERS)
+        for row in rows.iterator(chunk_size=2000):
+            yield writer.writerow(_merged_deans_list_export_values(row))
+    
+    response = StreamingHttpResponse(generate(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename=Deans_List_Merged_{year}.csv'
+    return response
 
 
 @login_required
@@ -3798,7 +3780,7 @@ def merged_deans_list(request):
     available_years = DeanListStudent.objects.values_list('year', flat=True).distinct().order_by('-year')
     
     selected_year = request.GET.get('year')
-    export = request.GET.get('export') == 'excel'
+    export = request.GET.get('export')
     
     merged_data = []
     
@@ -3806,105 +3788,30 @@ def merged_deans_list(request):
         try:
             selected_year = int(selected_year)
             
-            # Get all students from Fall and Spring of the selected year
-            # Using case-insensitive matching for semester
-            fall_students = DeanListStudent.objects.filter(
-                year=selected_year, 
-                semester__iexact='fall'
-            ).values('student_id', 'student_name', 'student_major', 'gpa', 'passed_credits')
-            
-            spring_students = DeanListStudent.objects.filter(
-                year=selected_year, 
-                semester__iexact='spring'
-            ).values('student_id', 'student_name', 'student_major', 'gpa', 'passed_credits')
-            
-            # Create dictionaries for quick lookup
-            fall_dict = {s['student_id']: s for s in fall_students}
-            spring_dict = {s['student_id']: s for s in spring_students}
+            # Exports stream straight from the SQL-side merge
+            if export in ('excel', 'csv'):
+                rows = merged_dean_list_rows(selected_year)
+                if rows.exists():
+                    if export == 'csv':
+                        return _merged_deans_list_csv_response(rows, selected_year)
+                    return _merged_deans_list_excel_response(rows, selected_year)
             
-            # Get all unique student IDs
-            all_student_ids = set(fall_dict.keys()) | set(spring_dict.keys())
-            
-            # Merge the data
-            for student_id in sorted(all_student_ids):
-                fall_data = fall_dict.get(student_id)
-                spring_data = spring_dict.get(student_id)
-                
-                # Get student name and major from whichever semester has data
-                student_name = (fall_data or spring_data)['student_name']
-                student_major = (fall_data or spring_data)['student_major']
-                
-                merged_data.append({
-                    'student_id': student_id,
-                    'student_name': student_name,
-                    'major': student_major,
-                    'gpa_fall': fall_data['gpa'] if fall_data else 'N/A',
-                    'gpa_spring': spring_data['gpa'] if spring_data else 'N/A',
-                    'credits_passed_fall': fall_data['passed_credits'] if fall_data else 'N/A',
-                    'credits_passed_spring': spring_data['passed_credits'] if spring_data else 'N/A',
-                })
+            # Merged in SQL and cached while the rows of this year are unchanged
+            merged_data = get_merged_dean_list(selected_year)
         
         except ValueError:
             messages.error(request, 'Invalid year selected.')
     
-    # Export to Excel if requested
-    if export and merged_data:
-        import openpyxl
-        from openpyxl.styles import Font, Alignment, PatternFill
-        from django.http import HttpResponse
-        
-        # Create workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = f"Dean's List {selected_year}"
-        
-        # Add headers
-        headers = ['Student ID', 'Student Name', 'Major', 'GPA Fall', 'GPA Spring', 
-                   'Credits Passed Fall', 'Credits Passed Spring']
-        ws.append(headers)
-        
-        # Style headers
-        header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-        header_font = Font(bold=True, color='FFFFFF')
-        
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Add data
-        for row in merged_data:
-            ws.append([
-                row['student_id'],
-                row['student_name'],
-                row['major'],
-                str(row['gpa_fall']),
-                str(row['gpa_spring']),
-                str(row['credits_passed_fall']),
-                str(row['credits_passed_spring']),
-            ])
-        
-        # Adjust column widths
-        ws.column_dimensions['A'].width = 15
-        ws.column_dimensions['B'].width = 30
-        ws.column_dimensions['C'].width = 15
-        ws.column_dimensions['D'].width = 12
-        ws.column_dimensions['E'].width = 12
-        ws.column_dimensions['F'].width = 20
-        ws.column_dimensions['G'].width = 20
-        
-        # Create response
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename=Deans_List_Merged_{selected_year}.xlsx'
-        wb.save(response)
-        return response
+    # Pagination - 100 students per page
+    paginator = Paginator(merged_data, 100)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
     context = {
         'available_years': available_years,
         'selected_year': selected_year,
-        'merged_data': merged_data,
+        'merged_data': page_obj,
+        'page_obj': page_obj,
+        'total_students': paginator.count,
         'user': request.user,
     }
     